@@ -0,0 +1,156 @@
+"""Benchmark the HTML-to-text extraction engines over a saved page corpus.
+
+Usage (from the service root):
+
+    # Save the pages listed in corpus_urls.txt into benchmarks/corpus/
+    python -m benchmarks.html_extraction_benchmark --download benchmarks/corpus_urls.txt
+
+    # Compare every installed engine
+    python -m benchmarks.html_extraction_benchmark --rounds 5
+
+Each engine runs in a fresh process so its peak RSS is not polluted by the
+other engines. Peak memory is reported as the growth of the process peak RSS
+over its baseline after the corpus was loaded.
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import resource
+import statistics
+import multiprocessing
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def download_corpus(urls_file, corpus_dir):
+    """Download every URL listed in urls_file into the corpus directory."""
+    from src.services.http_client_service import get_http_session
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+    }
+
+    with open(urls_file, encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    for url in urls:
+        file_name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+        try:
+            response = get_http_session().get(url, headers=headers, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"skip {url}: {e}")
+            continue
+
+        with open(os.path.join(corpus_dir, file_name), "wb") as f:
+            f.write(response.content)
+        print(f"saved {url} ({len(response.content) // 1024} KiB)")
+
+
+def load_corpus(corpus_dir):
+    """Load every saved page of the corpus as raw bytes."""
+    pages = []
+    for file_name in sorted(os.listdir(corpus_dir)):
+        if file_name.endswith((".html", ".htm")):
+            with open(os.path.join(corpus_dir, file_name), "rb") as f:
+                pages.append(f.read())
+    return pages
+
+
+def _peak_rss_kib():
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_engine(engine, corpus_dir, rounds, results_queue):
+    """Time one engine over the corpus inside a dedicated process."""
+    from src.services.html_extraction_service import EXTRACTION_ENGINES
+
+    extract = EXTRACTION_ENGINES[engine]
+    pages = load_corpus(corpus_dir)
+    extract(pages[0])  # Warm up imports and parser state
+    baseline_rss = _peak_rss_kib()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            page_started = time.perf_counter()
+            extract(page)
+            latencies.append(time.perf_counter() - page_started)
+    elapsed = time.perf_counter() - started
+
+    results_queue.put(
+        {
+            "engine": engine,
+            "pages": len(latencies),
+            "pages_per_second": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": (
+                statistics.quantiles(latencies, n=20)[-1] * 1000
+                if len(latencies) > 1
+                else latencies[0] * 1000
+            ),
+            "peak_memory_mib": (_peak_rss_kib() - baseline_rss) / 1024,
+        }
+    )
+
+
+def run_benchmark(corpus_dir, engines, rounds):
+    """Benchmark each engine in its own process and return the results."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for engine in engines:
+        results_queue = context.Queue()
+        process = context.Process(
+            target=_run_engine, args=(engine, corpus_dir, rounds, results_queue)
+        )
+        process.start()
+        results.append(results_queue.get())
+        process.join()
+
+    return results
+
+
+def print_results(results):
+    print(
+        f"{'engine':<12}{'pages':>8}{'pages/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'peak MiB':>10}"
+    )
+    for result in sorted(results, key=lambda r: -r["pages_per_second"]):
+        print(
+            f"{result['engine']:<12}{result['pages']:>8}"
+            f"{result['pages_per_second']:>12.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['peak_memory_mib']:>10.1f}"
+        )
+
+
+def main():
+    from src.services.html_extraction_service import get_available_engines
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--download", metavar="URLS_FILE")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--engines", nargs="+", default=None, help="Defaults to all installed"
+    )
+    args = parser.parse_args()
+
+    if args.download:
+        download_corpus(args.download, args.corpus)
+
+    if not os.path.isdir(args.corpus) or not load_corpus(args.corpus):
+        parser.error(f"No .html pages found in {args.corpus}, use --download first")
+
+    engines = args.engines or get_available_engines()
+    print_results(run_benchmark(args.corpus, engines, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
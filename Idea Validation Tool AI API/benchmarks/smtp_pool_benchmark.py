@@ -0,0 +1,186 @@
+"""Benchmark SMTP delivery with and without the pooled sessions of email_service.
+
+Usage (from the service root):
+
+    pip install aiosmtpd
+
+    # Implicit TLS like production, with a throwaway self-signed certificate
+    python -m benchmarks.smtp_pool_benchmark --messages 500
+
+    # Plain SMTP, isolates the cost of connect and login from TLS
+    python -m benchmarks.smtp_pool_benchmark --plain
+
+A local aiosmtpd server stands in for the real SMTP server. The
+"per-message" mode runs the pool with no idle sessions, which is what
+send_email did before the pool: connect, TLS handshake, login and QUIT for
+every message. The "pooled" mode reuses authenticated sessions. The
+certificate is made with the openssl CLI.
+"""
+
+import os
+import sys
+import ssl
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+
+HOST = "127.0.0.1"
+SENDER = "benchmark@example.com"
+
+
+def _make_certificate(directory):
+    """Create a self-signed certificate for the local server."""
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-subj",
+            "/CN=localhost",
+            "-days",
+            "1",
+            "-keyout",
+            key_file,
+            "-out",
+            cert_file,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+def start_server(port, ssl_context):
+    """Start an aiosmtpd server that accepts every login and message."""
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+
+    class CountingHandler:
+        def __init__(self):
+            self.messages = 0
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages += 1
+            return "250 Message accepted for delivery"
+
+    handler = CountingHandler()
+    controller = Controller(
+        handler,
+        hostname=HOST,
+        port=port,
+        ssl_context=ssl_context,
+        authenticator=lambda *args: AuthResult(success=True),
+        auth_require_tls=False,
+    )
+    controller.start()
+    return controller, handler
+
+
+def run_mode(pool, message, messages, threads):
+    """Send messages from several threads and time every single send."""
+    latencies = []
+    latencies_lock = threading.Lock()
+    per_thread = [
+        messages // threads + (i < messages % threads) for i in range(threads)
+    ]
+
+    def send(count):
+        thread_latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            pool.sendmail(SENDER, "receiver@example.com", message)
+            thread_latencies.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(thread_latencies)
+
+    workers = [threading.Thread(target=send, args=(count,)) for count in per_thread]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    pool.close_all()
+    latencies.sort()
+    return {
+        "seconds": elapsed,
+        "messages_per_second": messages / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "connections": pool.connections_opened,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--plain", action="store_true", help="no TLS")
+    args = parser.parse_args()
+
+    try:
+        import aiosmtpd  # noqa: F401
+    except ImportError:
+        sys.exit("aiosmtpd is required: pip install aiosmtpd")
+
+    # email_service reads its settings on import
+    os.environ.update(
+        {
+            "SENDER_HOST": HOST,
+            "SENDER_PORT": str(args.port),
+            "SENDER_EMAIL": SENDER,
+            "SENDER_PASSWORD": "benchmark",
+            "SENDER_NAME": "Benchmark",
+            "SENDER_SECURITY": "none" if args.plain else "ssl",
+        }
+    )
+    logging.disable(logging.WARNING)
+    from src.services.email_service import SMTPConnectionPool, build_message
+
+    # About the size of a results email
+    body = "<html><body>" + "<p>Analysis paragraph.</p>\n" * 400 + "</body></html>"
+    message = build_message("receiver@example.com", "Benchmark", body).as_string()
+
+    with tempfile.TemporaryDirectory() as directory:
+        ssl_context = None if args.plain else _make_certificate(directory)
+        controller, handler = start_server(args.port, ssl_context)
+        try:
+            modes = {
+                "per-message": SMTPConnectionPool(max_idle_connections=0),
+                "pooled": SMTPConnectionPool(max_idle_connections=args.threads),
+            }
+            print(
+                f"{args.messages} messages of {len(message) // 1024} KiB, "
+                f"{args.threads} thread(s), {'plain' if args.plain else 'TLS'}"
+            )
+            print(
+                f"{'mode':<12} {'msg/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'sessions':>9}"
+            )
+            for name, pool in modes.items():
+                result = run_mode(pool, message, args.messages, args.threads)
+                print(
+                    f"{name:<12} {result['messages_per_second']:>9.1f} "
+                    f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                    f"{result['connections']:>9}"
+                )
+        finally:
+            controller.stop()
+
+    print(f"server accepted {handler.messages} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+#!/bin/sh
+set -e
+
+# Metric files of processes from an earlier run of this container would be
+# merged into the current metrics, start every container with an empty
+# multiprocess directory (see metrics_service.py)
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    find "$PROMETHEUS_MULTIPROC_DIR" -mindepth 1 -delete
+fi
+
+exec "$@"
@@ -1,9 +1,29 @@
 import os
+import uuid
+import logging
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+from sqlalchemy import update
 from dotenv import load_dotenv
-from src.tasks import process_search_and_email
+from src.tasks import process_search_and_email, drain_email_outbox
 from src.models import get_db_session, SearchTask, RelevantPost
+from src.services.search_cache_service import get_search_cache_stats, purge_search_cache
+from src.services.page_cache_service import get_page_cache_stats
+from src.services.summary_cache_service import get_summary_cache_stats
+from src.services.rate_limiter_service import get_rate_limiter_stats
+from src.services.coalescing_service import (
+    build_request_fingerprint,
+    join_in_flight_request,
+    release_in_flight_request,
+    get_coalescing_stats,
+)
+from src.services.replay_service import create_replay_task
+from src.services.metrics_service import generate_app_metrics
+from src.services.email_outbox_service import get_outbox_stats
+from src.services.semantic_cache_service import (
+    get_semantic_cache_stats,
+    rebuild_index,
+)
 from functools import wraps
 
 # region Load environment variables
@@ -63,14 +83,54 @@ def search_and_email():
         user_query = data.get("query")
         problem_statement = data.get("problem_statement", "")
         target_audience = data.get("target_audience", "")
+        # Clients can opt out of receiving recently stored results
+        allow_replay = data.get("replay", True) is not False
 
         if not user_email or not user_query:
             return jsonify({"error": "Email and query are required"}), 400
 
-        # Queue the task
-        task = process_search_and_email.delay(
-            user_email, user_query, problem_statement, target_audience
+        fingerprint = build_request_fingerprint(
+            user_query, problem_statement, target_audience
         )
+        task_id = str(uuid.uuid4())
+
+        # Answer from a recently completed identical request if there is one
+        replayed_summary = None
+        if allow_replay:
+            replayed_summary = create_replay_task(
+                fingerprint,
+                task_id,
+                user_email,
+                user_query,
+                problem_statement,
+                target_audience,
+            )
+
+        if replayed_summary:
+            drain_email_outbox.delay()
+        else:
+            # Attach to an identical request that is still being processed
+            leader_task_id = join_in_flight_request(fingerprint, task_id, user_email)
+            if leader_task_id:
+                logging.info(
+                    f"Coalesced request of {user_email} into task {leader_task_id}"
+                )
+            else:
+                # Queue the task
+                try:
+                    process_search_and_email.apply_async(
+                        args=(
+                            user_email,
+                            user_query,
+                            problem_statement,
+                            target_audience,
+                        ),
+                        kwargs={"fingerprint": fingerprint},
+                        task_id=task_id,
+                    )
+                except Exception:
+                    release_in_flight_request(fingerprint, task_id)
+                    raise
 
         return (
             jsonify(
@@ -119,6 +179,7 @@ def get_task_status(task_id):
             ),
             "analysis": task.analysis,
             "relevant_posts": posts_list,
+            "replayed_from": task.replayed_from,
         }
 
         session.close()
@@ -128,6 +189,60 @@ def get_task_status(task_id):
         return jsonify({"error": f"An error occurred: {e}"}), 500
 
 
+@app.route("/api/v1/tasks/<task_id>/resume", methods=["POST"])
+@requires_auth
+def resume_task(task_id):
+    """Requeue a failed task, it continues from its first incomplete stage."""
+    try:
+        session = get_db_session()
+        # Single conditional UPDATE, so a task cannot be resumed twice
+        task = session.execute(
+            update(SearchTask)
+            .where(SearchTask.task_id == task_id, SearchTask.status == "FAILURE")
+            .values(status="PENDING", completed_at=None)
+            .returning(
+                SearchTask.email,
+                SearchTask.query,
+                SearchTask.problem_statement,
+                SearchTask.target_audience,
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        session.commit()
+
+        if not task:
+            status = (
+                session.query(SearchTask.status)
+                .filter(SearchTask.task_id == task_id)
+                .scalar()
+            )
+            session.close()
+            if status is None:
+                return jsonify({"error": "Task not found"}), 404
+            return (
+                jsonify(
+                    {"error": f"Only failed tasks can be resumed, task is {status}"}
+                ),
+                409,
+            )
+
+        process_search_and_email.apply_async(
+            args=(
+                task.email,
+                task.query,
+                task.problem_statement or "",
+                task.target_audience or "",
+            ),
+            task_id=task_id,
+        )
+
+        session.close()
+        return jsonify({"task_id": task_id, "status": "PENDING"}), 202
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
 @app.route("/api/v1/tasks", methods=["GET"])
 @requires_auth
 def list_tasks():
@@ -172,5 +287,81 @@ def list_tasks():
         return jsonify({"error": f"An error occurred: {e}"}), 500
 
 
+@app.route("/api/v1/cache/stats", methods=["GET"])
+@requires_auth
+def get_cache_stats():
+    """Get hit/miss statistics of the result caches."""
+    try:
+        stats = {
+            "search": get_search_cache_stats(),
+            "pages": get_page_cache_stats(),
+            "summaries": get_summary_cache_stats(),
+            "coalescing": get_coalescing_stats(),
+            "semantic": get_semantic_cache_stats(),
+        }
+        return jsonify(stats), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
+@app.route("/api/v1/cache/search", methods=["DELETE"])
+@requires_auth
+def purge_search_results_cache():
+    """Purge all cached Google search results."""
+    try:
+        deleted = purge_search_cache()
+        return jsonify({"deleted": deleted}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
+@app.route("/api/v1/cache/semantic/rebuild", methods=["POST"])
+@requires_auth
+def rebuild_semantic_cache_index():
+    """Rebuild the semantic index from the embeddings stored on completed tasks."""
+    try:
+        indexed = rebuild_index()
+        return jsonify({"indexed": indexed}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
+@app.route("/api/v1/rate-limits/openai", methods=["GET"])
+@requires_auth
+def get_openai_rate_limit_stats():
+    """Get the OpenAI limiter configuration and wait-time statistics."""
+    try:
+        return jsonify(get_rate_limiter_stats()), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
+@app.route("/api/v1/email/outbox", methods=["GET"])
+@requires_auth
+def get_email_outbox_stats():
+    """Get the number of queued, sent and failed results emails."""
+    try:
+        return jsonify(get_outbox_stats()), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
+@app.route("/metrics", methods=["GET"])
+@requires_auth
+def get_metrics():
+    """Expose the pipeline metrics in the Prometheus text format."""
+    try:
+        payload, content_type = generate_app_metrics()
+        return Response(payload, content_type=content_type), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from kombu import Queue
 from dotenv import load_dotenv
 
 # region Load environment variables
@@ -8,6 +9,15 @@ load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
 
+# Set per worker profile, see the worker services in docker-compose.yml
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", "1")
+)
+
+# Safety net for the email outbox, emails are normally sent right after the
+# pipeline queues them
+EMAIL_OUTBOX_SWEEP_SECONDS = float(os.getenv("EMAIL_OUTBOX_SWEEP_SECONDS", "30"))
+
 # endregion
 
 # Create Celery instance
@@ -33,4 +43,40 @@ celery_app.conf.update(
         "socket_connect_timeout": 30,
         "retry_on_timeout": True,
     },
+    worker_prefetch_multiplier=CELERY_WORKER_PREFETCH_MULTIPLIER,
 )
+
+# Route each workload type to its own queue so every tier can be scaled and
+# tuned on its own: "fetch" is network bound, "parse" is CPU bound, "llm" is
+# rate limited by OpenAI and "email" is bound by SMTP. Orchestration tasks
+# stay on "default".
+celery_app.conf.update(
+    task_default_queue="default",
+    task_queues=(
+        Queue("default"),
+        Queue("fetch"),
+        Queue("parse"),
+        Queue("llm"),
+        Queue("email"),
+    ),
+    task_routes={
+        "tasks.fetch_page_stage": {"queue": "fetch"},
+        "tasks.parse_page_stage": {"queue": "parse"},
+        "tasks.similar_idea_stage": {"queue": "llm"},
+        "tasks.search_stage": {"queue": "llm"},
+        "tasks.summarize_page_stage": {"queue": "llm"},
+        "tasks.summarize_batch_stage": {"queue": "llm"},
+        "tasks.synthesize_stage": {"queue": "llm"},
+        "tasks.drain_email_outbox": {"queue": "email"},
+    },
+)
+
+# Periodic tasks, run by the beat service in docker-compose.yml
+celery_app.conf.beat_schedule = {
+    "drain-email-outbox": {
+        "task": "tasks.drain_email_outbox",
+        "schedule": EMAIL_OUTBOX_SWEEP_SECONDS,
+        # A missed sweep is superseded by the next one
+        "options": {"expires": EMAIL_OUTBOX_SWEEP_SECONDS},
+    },
+}
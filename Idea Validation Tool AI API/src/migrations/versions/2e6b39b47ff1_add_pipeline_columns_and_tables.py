@@ -0,0 +1,120 @@
+"""Add pipeline columns and tables
+
+Revision ID: 2e6b39b47ff1
+Revises: c07380d79cbf
+Create Date: 2026-10-17 01:11:04.318207
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2e6b39b47ff1"
+down_revision = "c07380d79cbf"
+branch_labels = None
+depends_on = None
+
+
+# Databases created before the migrations may already have some of these, the
+# create-at-import code in src/models.py added new nullable columns, tables
+# and indexes on every start. Only what is missing is created.
+
+
+def _search_task_columns():
+    return [
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("llm_usage", sa.Text(), nullable=True),
+        sa.Column("fingerprint", sa.String(length=64), nullable=True),
+        sa.Column("replayed_from", sa.String(length=255), nullable=True),
+        sa.Column("search_results", sa.Text(), nullable=True),
+        sa.Column("idea_embedding", sa.LargeBinary(), nullable=True),
+        sa.Column("reused_results_from", sa.String(length=255), nullable=True),
+        sa.Column("refined_query", sa.Text(), nullable=True),
+        sa.Column("search_items", sa.Text(), nullable=True),
+        sa.Column("synthesized_at", sa.DateTime(), nullable=True),
+        sa.Column("email_sent_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("search_tasks")
+    }
+    for column in _search_task_columns():
+        if column.name not in existing_columns:
+            op.add_column("search_tasks", column)
+
+    existing_indexes = {
+        index["name"] for index in inspector.get_indexes("search_tasks")
+    }
+    if "ix_search_tasks_fingerprint" not in existing_indexes:
+        op.create_index(
+            op.f("ix_search_tasks_fingerprint"),
+            "search_tasks",
+            ["fingerprint"],
+            unique=False,
+        )
+
+    if not inspector.has_table("page_summaries"):
+        op.create_table(
+            "page_summaries",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.String(length=255), nullable=False),
+            sa.Column("page_order", sa.Integer(), nullable=False),
+            sa.Column("link", sa.Text(), nullable=False),
+            sa.Column("title", sa.Text(), nullable=True),
+            sa.Column("summary", sa.Text(), nullable=True),
+            sa.Column("llm_usage", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_page_summaries_task_order",
+            "page_summaries",
+            ["task_id", "page_order"],
+            unique=True,
+        )
+
+    if not inspector.has_table("email_outbox"):
+        op.create_table(
+            "email_outbox",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.String(length=255), nullable=False),
+            sa.Column("recipient", sa.String(length=255), nullable=False),
+            sa.Column("subject", sa.String(length=255), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(length=50), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("sent_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_email_outbox_status_next_attempt",
+            "email_outbox",
+            ["status", "next_attempt_at"],
+            unique=False,
+        )
+        op.create_index(
+            "ix_email_outbox_task_recipient",
+            "email_outbox",
+            ["task_id", "recipient"],
+            unique=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_email_outbox_task_recipient", table_name="email_outbox")
+    op.drop_index("ix_email_outbox_status_next_attempt", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    op.drop_index("ix_page_summaries_task_order", table_name="page_summaries")
+    op.drop_table("page_summaries")
+    op.drop_index(op.f("ix_search_tasks_fingerprint"), table_name="search_tasks")
+    for column in reversed(_search_task_columns()):
+        op.drop_column("search_tasks", column.name)
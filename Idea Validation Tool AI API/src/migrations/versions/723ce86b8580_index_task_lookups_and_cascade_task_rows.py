@@ -0,0 +1,80 @@
+"""Index task lookups and cascade task rows
+
+Revision ID: 723ce86b8580
+Revises: 2e6b39b47ff1
+Create Date: 2026-10-17 01:11:12.283630
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "723ce86b8580"
+down_revision = "2e6b39b47ff1"
+branch_labels = None
+depends_on = None
+
+
+# Tables whose task_id now references search_tasks
+TASK_CHILD_TABLES = ("email_outbox", "page_summaries", "relevant_posts")
+
+
+def upgrade():
+    # Rows of tasks deleted by hand would fail the new foreign keys
+    for table in TASK_CHILD_TABLES:
+        op.execute(
+            f"DELETE FROM {table} WHERE task_id NOT IN (SELECT task_id FROM search_tasks)"
+        )
+
+    op.create_foreign_key(
+        "fk_email_outbox_task_id",
+        "email_outbox",
+        "search_tasks",
+        ["task_id"],
+        ["task_id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "fk_page_summaries_task_id",
+        "page_summaries",
+        "search_tasks",
+        ["task_id"],
+        ["task_id"],
+        ondelete="CASCADE",
+    )
+    op.create_index(
+        "ix_relevant_posts_task_id", "relevant_posts", ["task_id", "id"], unique=False
+    )
+    op.create_foreign_key(
+        "fk_relevant_posts_task_id",
+        "relevant_posts",
+        "search_tasks",
+        ["task_id"],
+        ["task_id"],
+        ondelete="CASCADE",
+    )
+    op.create_index(
+        "ix_search_tasks_email_created_at",
+        "search_tasks",
+        ["email", "created_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_search_tasks_status_created_at",
+        "search_tasks",
+        ["status", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_search_tasks_status_created_at", table_name="search_tasks")
+    op.drop_index("ix_search_tasks_email_created_at", table_name="search_tasks")
+    op.drop_constraint(
+        "fk_relevant_posts_task_id", "relevant_posts", type_="foreignkey"
+    )
+    op.drop_index("ix_relevant_posts_task_id", table_name="relevant_posts")
+    op.drop_constraint(
+        "fk_page_summaries_task_id", "page_summaries", type_="foreignkey"
+    )
+    op.drop_constraint("fk_email_outbox_task_id", "email_outbox", type_="foreignkey")
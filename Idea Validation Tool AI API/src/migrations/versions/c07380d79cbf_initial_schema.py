@@ -0,0 +1,59 @@
+"""Initial schema
+
+Revision ID: c07380d79cbf
+Revises:
+Create Date: 2026-10-17 01:10:55.584792
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c07380d79cbf"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# The schema the create-at-import code in src/models.py used to create before
+# the migrations existed. A database that already has these tables is adopted
+# as is, the later revisions add everything that came after.
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("search_tasks"):
+        op.create_table(
+            "search_tasks",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.String(length=255), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("query", sa.Text(), nullable=False),
+            sa.Column("problem_statement", sa.Text(), nullable=True),
+            sa.Column("target_audience", sa.Text(), nullable=True),
+            sa.Column("analysis", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+            sa.Column("status", sa.String(length=50), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("task_id"),
+        )
+    if not _has_table("relevant_posts"):
+        op.create_table(
+            "relevant_posts",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.String(length=255), nullable=False),
+            sa.Column("title", sa.Text(), nullable=False),
+            sa.Column("link", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade():
+    op.drop_table("relevant_posts")
+    op.drop_table("search_tasks")
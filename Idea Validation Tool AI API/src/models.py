@@ -1,6 +1,16 @@
 import os
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, create_engine
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    LargeBinary,
+    Index,
+    ForeignKey,
+    create_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -23,6 +33,11 @@ Base = declarative_base()
 # Define the SearchTask model
 class SearchTask(Base):
     __tablename__ = "search_tasks"
+    __table_args__ = (
+        # The task list filters on email or status, newest first
+        Index("ix_search_tasks_email_created_at", "email", "created_at"),
+        Index("ix_search_tasks_status_created_at", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     task_id = Column(String(255), unique=True, nullable=False)  # Celery task ID
@@ -31,9 +46,22 @@ class SearchTask(Base):
     problem_statement = Column(Text)
     target_audience = Column(Text)
     analysis = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow())
+    created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     status = Column(String(50), default="PENDING")  # PENDING, SUCCESS, FAILURE
+    prompt_tokens = Column(Integer, nullable=True)  # Total LLM input tokens
+    completion_tokens = Column(Integer, nullable=True)  # Total LLM output tokens
+    llm_usage = Column(Text, nullable=True)  # JSON list of per-call token usage
+    fingerprint = Column(String(64), nullable=True, index=True)  # Request hash
+    replayed_from = Column(String(255), nullable=True)  # Source task of a replay
+    search_results = Column(Text, nullable=True)  # JSON of the summarized pages
+    idea_embedding = Column(LargeBinary, nullable=True)  # float32 idea vector
+    reused_results_from = Column(String(255), nullable=True)  # Semantic cache hit
+    # Stage checkpoints, a retried or resumed pipeline skips completed stages
+    refined_query = Column(Text, nullable=True)  # Search term of the search stage
+    search_items = Column(Text, nullable=True)  # JSON of the Google hits
+    synthesized_at = Column(DateTime, nullable=True)  # Analysis and posts stored
+    email_sent_at = Column(DateTime, nullable=True)  # Results emailed
 
     def __repr__(self):
         return f"<SearchTask(id={self.id}, email='{self.email}', query='{self.query[:30]}...', status='{self.status}')>"
@@ -42,28 +70,91 @@ class SearchTask(Base):
 # Define the RelevantPost model (for storing search results)
 class RelevantPost(Base):
     __tablename__ = "relevant_posts"
+    __table_args__ = (
+        # Posts of a task in insertion order, also serves the cascade
+        Index("ix_relevant_posts_task_id", "task_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
-    task_id = Column(String(255), nullable=False)  # Celery task ID
+    task_id = Column(
+        String(255),
+        ForeignKey(
+            "search_tasks.task_id",
+            name="fk_relevant_posts_task_id",
+            ondelete="CASCADE",
+        ),
+        nullable=False,
+    )  # Celery task ID
     title = Column(Text, nullable=False)
     link = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow())
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<RelevantPost(id={self.id}, title='{self.title[:30]}...', task_id='{self.task_id}')>"
 
 
-# Create the tables in the database
-# Import inspect from sqlalchemy
-from sqlalchemy import inspect
+# Define the SummarizedPage model (checkpoint of each page summary of a task)
+class SummarizedPage(Base):
+    __tablename__ = "page_summaries"
+    __table_args__ = (
+        Index("ix_page_summaries_task_order", "task_id", "page_order", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(
+        String(255),
+        ForeignKey(
+            "search_tasks.task_id",
+            name="fk_page_summaries_task_id",
+            ondelete="CASCADE",
+        ),
+        nullable=False,
+    )  # Celery task ID
+    page_order = Column(Integer, nullable=False)  # Rank of the page in the search
+    link = Column(Text, nullable=False)
+    title = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True)
+    llm_usage = Column(Text, nullable=True)  # JSON list of the calls it took
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SummarizedPage(id={self.id}, task_id='{self.task_id}', page_order={self.page_order})>"
+
+
+# Define the EmailOutbox model (emails waiting to be sent by the outbox sender)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_task_recipient", "task_id", "recipient", unique=True),
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(
+        String(255),
+        ForeignKey(
+            "search_tasks.task_id",
+            name="fk_email_outbox_task_id",
+            ondelete="CASCADE",
+        ),
+        nullable=False,
+    )  # Celery task ID
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)  # Rendered HTML
+    status = Column(String(50), default="PENDING")  # PENDING, SENT, FAILED
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)  # Due or leased until
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, task_id='{self.task_id}', status='{self.status}')>"
 
-# Create inspector
-inspector = inspect(engine)
 
-# Only create tables that don't exist
-for table in Base.metadata.sorted_tables:
-    if not inspector.has_table(table.name):
-        table.create(engine)
+# The schema is managed by the Alembic migrations in src/migrations, run
+# alembic -c src/migrations/alembic.ini upgrade head before starting the app
 
 # Create a session factory
 Session = sessionmaker(bind=engine)
@@ -1,11 +1,47 @@
 import os
+import re
 import json
+import time
+import codecs
 import requests
 import logging
-from bs4 import BeautifulSoup
+import urllib3.exceptions as urllib3_exceptions
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from openai import OpenAI
+from src.services.http_client_service import get_page, get_search_api_session
+from src.services.search_cache_service import get_cached_search, cache_search
+from src.services.page_cache_service import (
+    get_cached_page,
+    store_page,
+    mark_page_revalidated,
+    single_flight,
+    end_single_flight,
+)
+from src.services.summary_cache_service import get_cached_summary, cache_summary
+from src.services.html_extraction_service import extract_text
+from src.services.extractive_summary_service import (
+    compress_text,
+    summarize_locally,
+    EXTRACTIVE_COMPRESSION_ENABLED,
+)
+from src.services.metrics_service import track_stage, record_llm_usage
+from src.services.rate_limiter_service import (
+    acquire_openai_capacity,
+    settle_openai_tokens,
+)
+from src.services.token_budget_service import (
+    trim_to_token_budget,
+    build_rag_context,
+    estimate_chat_tokens,
+    SUMMARY_INPUT_TOKEN_BUDGET,
+    SUMMARY_OUTPUT_TOKEN_BUDGET,
+    RAG_INPUT_TOKEN_BUDGET,
+    RAG_OUTPUT_TOKEN_BUDGET,
+)
 
 # region Load environment variables
 
@@ -18,6 +54,19 @@ GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_AI_MINI_MODEL = os.getenv("OPENAI_AI_MINI_MODEL")
 
+# Google hits requested per search, the ranking decides which ones are fetched
+SEARCH_DEPTH = int(os.getenv("SEARCH_DEPTH", "10"))
+
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+FETCH_TASK_BUDGET_SECONDS = float(os.getenv("FETCH_TASK_BUDGET_SECONDS", "25"))
+SUMMARY_BATCH_SIZE = max(int(os.getenv("SUMMARY_BATCH_SIZE", "4")), 1)
+LOCAL_SUMMARY_FALLBACK_ENABLED = (
+    os.getenv("LOCAL_SUMMARY_FALLBACK_ENABLED", "true").lower() == "true"
+)
+
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+PAGE_READ_CHUNK_BYTES = 64 * 1024
+
 # endregion
 
 # region Clients setup
@@ -34,6 +83,20 @@ logging.basicConfig(
 
 # endregion
 
+# Only these content types are worth downloading and parsing as text
+ALLOWED_PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+CHARSET_PATTERN = re.compile(rb"""charset=["']?([\w.:-]+)""", re.IGNORECASE)
+
+# region Fetch concurrency limits
+
+# Per-host semaphores are shared by every fetch in this process so a single
+# slow site cannot take over the whole pool.
+_host_semaphores = defaultdict(lambda: threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT))
+_host_semaphores_lock = threading.Lock()
+
+# endregion
+
 
 # Response schema for the RAG structured response
 class RelevantPost(BaseModel):
@@ -46,10 +109,45 @@ class RAGResponse(BaseModel):
     relevant_posts: list[RelevantPost]
 
 
-def generate_search_term(query):
+# Response schema for batched page summaries
+class PageSummary(BaseModel):
+    index: int
+    summary: str
+
+
+class BatchSummaryResponse(BaseModel):
+    summaries: list[PageSummary]
+
+
+def _create_chat_completion(stage, usage=None, **kwargs):
+    """Call the chat completions API within the shared rate limit.
+
+    Waits for cluster-wide request and token capacity, then records the token
+    usage of the call and corrects the limiter with the actual token count.
+    """
+    estimated_tokens = estimate_chat_tokens(
+        kwargs["messages"], kwargs.get("max_completion_tokens")
+    )
+    waited = acquire_openai_capacity(estimated_tokens)
+    if waited > 1:
+        logging.info(f"Waited {waited:.1f}s for OpenAI capacity ({stage})")
+
+    with track_stage(stage):
+        response = open_ai_client.chat.completions.create(**kwargs)
+    record_llm_usage(stage, response)
+    if usage is not None:
+        usage.record(stage, response)
+    if getattr(response, "usage", None):
+        settle_openai_tokens(estimated_tokens, response.usage.total_tokens)
+    return response
+
+
+def generate_search_term(query, usage=None):
     """Generate a concise Google search term (3-5 words) based on the user's query."""
     try:
-        response = open_ai_client.chat.completions.create(
+        response = _create_chat_completion(
+            "search_term",
+            usage,
             model=OPENAI_AI_MINI_MODEL,
             messages=[
                 {
@@ -67,6 +165,11 @@ def generate_search_term(query):
 
 def google_search(query, search_depth=10, site_filter=None):
     """Perform a Google search and return the results."""
+    cached_results = get_cached_search(query, search_depth, site_filter)
+    if cached_results is not None:
+        logging.info(f"Using cached search results for: {query}")
+        return cached_results
+
     service_url = GOOGLE_SEARCH_URL
     params = {
         "q": query,
@@ -76,97 +179,366 @@ def google_search(query, search_depth=10, site_filter=None):
     }
 
     try:
-        response = requests.get(service_url, params=params)
-        response.raise_for_status()
-        results = response.json()
-
-        if "items" in results:
-            if site_filter:
-                filtered_results = [
-                    res for res in results["items"] if site_filter in res["link"]
-                ]
-                return filtered_results if filtered_results else []
-            return results["items"]
-        return []
+        with track_stage("google_search"):
+            response = get_search_api_session().get(
+                service_url, params=params, timeout=10
+            )
+            response.raise_for_status()
+            results = response.json()
+
+        items = results.get("items", [])
+        if site_filter:
+            items = [res for res in items if site_filter in res["link"]]
+
+        cache_search(query, search_depth, site_filter, items)
+        return items
     except requests.exceptions.RequestException as e:
         logging.error(f"Error during search: {e}")
         return []
 
 
-def fetch_page_content(url, max_tokens=50000):
-    """Retrieve and clean web page content"""
+def fetch_page_content(url, deadline=None):
+    """Retrieve a web page, its text is then produced by parse_page_content.
+
+    Returns {"text": ...} for a cached page, or the downloaded {"html": ...,
+    "etag": ..., "last_modified": ...} of a new one. A download still running
+    at the deadline (epoch seconds) is abandoned.
+    """
     if url.endswith(".pdf"):
         logging.info(f"Skipping {url}: PDF files are not processed.")
         return None  # Ignore PDFs entirely
 
+    cached_page = get_cached_page(url)
+    if not (cached_page and cached_page["fresh"]):
+        with single_flight(url, deadline) as flight:
+            if flight["waited_for_peer"]:
+                # Another task has just downloaded this page, reuse its copy
+                cached_page = get_cached_page(url) or cached_page
+
+            if not (cached_page and cached_page["fresh"]):
+                page = _download_page(url, cached_page, deadline)
+                # Identical downloads keep waiting until the text is cached
+                flight["awaiting_parse"] = bool(page and "html" in page)
+                return page
+
+    return {"text": cached_page["text"]}
+
+
+def _download_page(url, cached_page=None, deadline=None):
+    """Download a page, revalidating a stale cached copy if present."""
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
     }
+    if cached_page:
+        if cached_page["etag"]:
+            headers["If-None-Match"] = cached_page["etag"]
+        if cached_page["last_modified"]:
+            headers["If-Modified-Since"] = cached_page["last_modified"]
+
+    if deadline is not None and deadline <= time.time():
+        logging.info(f"Skipping {url}: fetch budget exhausted")
+        return None
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, "html.parser")
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
-
-        text = soup.get_text(separator=" ", strip=True)
-        return text[: max_tokens * 4]  # Approximate character limit for LLM input
+        with track_stage("fetch"), get_page(
+            url, deadline, headers=headers, stream=True
+        ) as response:
+            if response.status_code == 304 and cached_page:
+                mark_page_revalidated(url)
+                return {"text": cached_page["text"]}
+            response.raise_for_status()
+
+            if not _is_downloadable(url, response):
+                return None
+            return {
+                "html": _read_page_html(url, response, deadline),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to retrieve {url}: {e}")
         return None
 
 
-def summarize_content(content, search_query, character_limit=700):
+def _is_downloadable(url, response):
+    """Check Content-Type and Content-Length before reading the body."""
+    content_type = response.headers.get("Content-Type", "")
+    mime_type = content_type.split(";")[0].strip().lower()
+    if mime_type and mime_type not in ALLOWED_PAGE_CONTENT_TYPES:
+        logging.info(f"Skipping {url}: unsupported content type {mime_type}")
+        return False
+
+    content_length = response.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > PAGE_MAX_BYTES:
+        logging.info(f"Skipping {url}: {content_length} bytes exceeds the page limit")
+        return False
+
+    return True
+
+
+def _read_page_html(url, response, deadline=None):
+    """Stream and incrementally decode the body, stopping at PAGE_MAX_BYTES.
+
+    Raises ReadTimeout when the deadline passes mid-body, a partial page is
+    never cached.
+    """
+    decoder = None
+    parts = []
+    bytes_read = 0
+
+    while True:
+        chunk = _read_page_chunk(response, deadline, bytes_read)
+        if not chunk:
+            break
+        if decoder is None:
+            charset = _detect_charset(response.headers.get("Content-Type", ""), chunk)
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+
+        remaining = PAGE_MAX_BYTES - bytes_read
+        parts.append(decoder.decode(chunk[:remaining]))
+        bytes_read += len(chunk)
+        if bytes_read >= PAGE_MAX_BYTES:
+            logging.info(f"Truncating {url} at {PAGE_MAX_BYTES} bytes")
+            break
+
+    if decoder is not None:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def _read_page_chunk(response, deadline, bytes_read):
+    """Read whatever part of the body has arrived, waiting no longer than the deadline.
+
+    Unlike iter_content, which blocks until a whole chunk has arrived, a slowly
+    trickling page is given up on at the deadline itself.
+    """
+    if deadline is not None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise requests.exceptions.ReadTimeout(
+                f"Fetch budget exhausted after {bytes_read} bytes"
+            )
+        sock = _response_socket(response)
+        if sock is not None:
+            sock.settimeout(remaining)
+
+    try:
+        return response.raw.read1(PAGE_READ_CHUNK_BYTES, decode_content=True)
+    except urllib3_exceptions.ReadTimeoutError as e:
+        raise requests.exceptions.ReadTimeout(
+            f"Fetch budget exhausted after {bytes_read} bytes"
+        ) from e
+    except (urllib3_exceptions.ProtocolError, urllib3_exceptions.DecodeError) as e:
+        raise requests.exceptions.ConnectionError(e) from e
+
+
+def _response_socket(response):
+    """Return the socket a streamed response body is read from, if reachable."""
+    connection = response.raw.connection
+    if connection is not None and connection.sock is not None:
+        return connection.sock
+
+    # A connection closing after this response hands its socket to the body reader
+    body = getattr(response.raw._fp, "fp", None)
+    return getattr(getattr(body, "raw", None), "_sock", None)
+
+
+def _detect_charset(content_type, first_chunk):
+    """Pick the body charset from the header or an early <meta> tag."""
+    match = CHARSET_PATTERN.search(content_type.encode("latin-1", "ignore"))
+    match = match or CHARSET_PATTERN.search(first_chunk[:4096])
+    charset = match.group(1).decode("ascii") if match else "utf-8"
+
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return "utf-8"
+
+
+def parse_page_content(url, page):
+    """Return the cleaned text of a page retrieved by fetch_page_content.
+
+    Downloaded HTML is extracted and the text stored in the page cache, which
+    also releases the identical downloads waiting for it.
+    """
+    if "html" not in page:
+        return page["text"]
+
+    try:
+        with track_stage("extraction"):
+            text = extract_text(page["html"])
+        store_page(url, text, etag=page["etag"], last_modified=page["last_modified"])
+    finally:
+        end_single_flight(url)
+    return text
+
+
+def prepare_page_content(content, search_query):
+    """Reduce page text to the part the summarizer needs to see.
+
+    Keeps the sentences most relevant to the query when extractive
+    compression is enabled, and always enforces the summary input budget.
+    """
+    if EXTRACTIVE_COMPRESSION_ENABLED:
+        with track_stage("compression"):
+            content = compress_text(content, search_query)
+    return trim_to_token_budget(content, SUMMARY_INPUT_TOKEN_BUDGET)
+
+
+def summarize_content(content, search_query, character_limit=700, usage=None):
     """Generate a concise summary of extracted web content"""
+    content = trim_to_token_budget(content, SUMMARY_INPUT_TOKEN_BUDGET)
+    cached_summary = get_cached_summary(
+        content, search_query, character_limit, OPENAI_AI_MINI_MODEL
+    )
+    if cached_summary is not None:
+        return cached_summary
+
+    return _request_summary(content, search_query, character_limit, usage)
+
+
+def _request_summary(content, search_query, character_limit, usage=None):
+    """Summarize one page with the LLM and memoize the summary."""
     prompt = (
         f"You are an AI assistant summarizing content relevant to '{search_query}'. "
         f"Provide a concise summary within {character_limit} characters."
     )
     try:
-        response = open_ai_client.chat.completions.create(
+        response = _create_chat_completion(
+            "summary",
+            usage,
             model=OPENAI_AI_MINI_MODEL,
             messages=[
                 {"role": "system", "content": prompt},
                 {"role": "user", "content": content},
             ],
+            max_completion_tokens=SUMMARY_OUTPUT_TOKEN_BUDGET,
         )
-        return response.choices[0].message.content.strip()
+        summary = response.choices[0].message.content.strip()
+        cache_summary(
+            content, search_query, character_limit, OPENAI_AI_MINI_MODEL, summary
+        )
+        return summary
     except Exception as e:
         logging.error(f"Summarization error: {e}")
-        return None
+        if not LOCAL_SUMMARY_FALLBACK_ENABLED:
+            return None
+
+        # Deliver an extractive summary rather than dropping the page
+        return summarize_locally(content, search_query, character_limit)
 
 
-def get_search_results(search_items, search_query, character_limit=700):
-    """Fetch content, summarize it, and return structured search results"""
-    results_list = []
-    for idx, item in enumerate(search_items, start=1):
-        url = item.get("link")
-        snippet = item.get("snippet", "")
-        web_content = fetch_page_content(url)
-
-        if not web_content:
-            logging.info(f"Skipping {url}")
-            continue
-        else:
-            summary = summarize_content(web_content, search_query, character_limit)
-            results_list.append(
-                {"order": idx, "link": url, "title": snippet, "summary": summary}
+def summarize_contents_batch(contents, search_query, character_limit=700, usage=None):
+    """Summarize several pages with one structured LLM call.
+
+    Returns the summaries in the order of contents. Cached pages are not sent
+    again, and pages missing from an unparsable or incomplete response fall
+    back to one call each.
+    """
+    contents = [
+        trim_to_token_budget(content, SUMMARY_INPUT_TOKEN_BUDGET)
+        for content in contents
+    ]
+    summaries = [
+        get_cached_summary(content, search_query, character_limit, OPENAI_AI_MINI_MODEL)
+        for content in contents
+    ]
+    pending = [index for index, summary in enumerate(summaries) if summary is None]
+
+    if len(pending) > 1:
+        prompt = (
+            f"You are an AI assistant summarizing content relevant to '{search_query}'. "
+            f"For every page provide a concise summary within {character_limit} characters.\n"
+            "Your response must follow this JSON format:\n"
+            '{"summaries": [{"index": 0, "summary": "Summary of the page with index 0"}]}'
+        )
+        pages = "\n\n".join(
+            f'<page index="{batch_index}">\n{contents[index]}\n</page>'
+            for batch_index, index in enumerate(pending)
+        )
+        try:
+            response = _create_chat_completion(
+                "summary_batch",
+                usage,
+                model=OPENAI_AI_MINI_MODEL,
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": pages},
+                ],
+                response_format={"type": "json_object"},
+                max_completion_tokens=SUMMARY_OUTPUT_TOKEN_BUDGET * len(pending),
+            )
+            response_data = BatchSummaryResponse.model_validate_json(
+                response.choices[0].message.content
+            )
+
+            for page_summary in response_data.summaries:
+                summary = page_summary.summary.strip()
+                if 0 <= page_summary.index < len(pending) and summary:
+                    index = pending[page_summary.index]
+                    summaries[index] = summary
+                    cache_summary(
+                        contents[index],
+                        search_query,
+                        character_limit,
+                        OPENAI_AI_MINI_MODEL,
+                        summary,
+                    )
+        except Exception as e:
+            logging.error(f"Batch summarization error, summarizing per page: {e}")
+
+    for index, summary in enumerate(summaries):
+        if summary is None:
+            summaries[index] = _request_summary(
+                contents[index], search_query, character_limit, usage
             )
+    return summaries
 
-    return results_list
 
+def _get_host_semaphore(url):
+    """Return the concurrency guard for the host of the given URL."""
+    host = urlparse(url).hostname or ""
+    with _host_semaphores_lock:
+        return _host_semaphores[host.lower()]
 
-def generate_rag_response(search_query, results, problem_statement, target_audience):
+
+def fetch_page_within_budget(url, deadline=None):
+    """Fetch a page while holding a per-host concurrency slot of this process.
+
+    Waiting for the slot counts against the deadline, a page whose host stays
+    busy until then is skipped.
+    """
+    host_slot = _get_host_semaphore(url)
+    wait_seconds = None if deadline is None else max(deadline - time.time(), 0)
+    if not host_slot.acquire(timeout=wait_seconds):
+        logging.info(f"Skipping {url}: host busy until the fetch budget ran out")
+        return None
+    try:
+        return fetch_page_content(url, deadline)
+    finally:
+        host_slot.release()
+
+
+def build_search_result(order, item, summary):
+    """Shape a summarized search item the way the RAG stage expects it."""
+    return {
+        "order": order,
+        "link": item.get("link"),
+        "title": item.get("snippet", ""),
+        "summary": summary,
+    }
+
+
+def generate_rag_response(
+    search_query, results, problem_statement, target_audience, usage=None
+):
     """Create a structured JSON response using GPT-4o-mini based on search results."""
-    formatted_results = [
-        {"title": item["title"], "link": item["link"], "summary": item["summary"]}
-        for item in results
-    ]
+    formatted_results = build_rag_context(results, RAG_INPUT_TOKEN_BUDGET)
 
     try:
-        response = open_ai_client.chat.completions.create(
+        response = _create_chat_completion(
+            "rag",
+            usage,
             model=OPENAI_AI_MINI_MODEL,
             messages=[
                 {
@@ -186,11 +558,12 @@ def generate_rag_response(search_query, results, problem_statement, target_audie
                 },
                 {
                     "role": "user",
-                    "content": f"User's Query: {search_query}\nUser's Problem Statement: {problem_statement}\nTarget Audience: {target_audience}\nResults:\n{json.dumps(formatted_results, indent=2)}",
+                    "content": f"User's Query: {search_query}\nUser's Problem Statement: {problem_statement}\nTarget Audience: {target_audience}\nResults:\n{formatted_results}",
                 },
             ],
             response_format={"type": "json_object"},
             temperature=0,
+            max_completion_tokens=RAG_OUTPUT_TOKEN_BUDGET,
         )
 
         response_json = json.loads(response.choices[0].message.content)
@@ -208,26 +581,10 @@ def generate_rag_response(search_query, results, problem_statement, target_audie
         return None
 
 
-def perform_search_and_summarize(search_query, problem_statement, target_audience):
-    refined_query = generate_search_term(search_query)
+def find_search_items(search_query, usage=None):
+    """Generate the refined search term and return it with the Google hits."""
+    refined_query = generate_search_term(search_query, usage)
 
     logging.info(f"Generating the proper search term: {refined_query}")
 
-    search_results = google_search(refined_query, search_depth=7)
-
-    if not search_results:
-        logging.info("No search results found.")
-        return None
-
-    structured_results = get_search_results(search_results, search_query)
-
-    final_summary = generate_rag_response(
-        search_query, structured_results, problem_statement, target_audience
-    )
-
-    output = {
-        "query": search_query,
-        "results": structured_results,
-        "final_summary": final_summary,
-    }
-    return output
+    return refined_query, google_search(refined_query, search_depth=SEARCH_DEPTH)
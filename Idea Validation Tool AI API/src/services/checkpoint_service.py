@@ -0,0 +1,182 @@
+import json
+import logging
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from src.models import get_db_session, SearchTask, RelevantPost, SummarizedPage
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+
+def _task_checkpoints(task_record):
+    return {
+        "refined_query": task_record.refined_query,
+        "search_items": (
+            json.loads(task_record.search_items)
+            if task_record.search_items is not None
+            else None
+        ),
+        "search_usage_calls": json.loads(task_record.llm_usage or "[]"),
+        "synthesized_at": task_record.synthesized_at,
+        "email_sent_at": task_record.email_sent_at,
+    }
+
+
+def load_task_checkpoints(task_id):
+    """Return the stage checkpoints stored on a task, or None if it is unknown."""
+    session = get_db_session()
+    try:
+        task_record = (
+            session.query(SearchTask).filter(SearchTask.task_id == task_id).first()
+        )
+        return _task_checkpoints(task_record) if task_record else None
+    finally:
+        session.close()
+
+
+def create_task_record(
+    task_id, user_email, user_query, problem_statement, target_audience, fingerprint
+):
+    """Insert the row of a task unless an earlier attempt did, in one transaction.
+
+    Returns the stage checkpoints of the task, empty for a new one.
+    """
+    session = get_db_session()
+    try:
+        task_record = (
+            session.query(SearchTask).filter(SearchTask.task_id == task_id).first()
+        )
+        if not task_record:
+            task_record = SearchTask(
+                task_id=task_id,
+                email=user_email,
+                query=user_query,
+                problem_statement=problem_statement,
+                target_audience=target_audience,
+                fingerprint=fingerprint,
+            )
+            session.add(task_record)
+
+        # Read before the commit expires the record and would reload it
+        checkpoints = _task_checkpoints(task_record)
+        session.commit()
+        return checkpoints
+    finally:
+        session.close()
+
+
+def save_search_checkpoint(task_id, refined_query, search_items, usage_calls):
+    """Store the search term and Google hits so they are never paid for twice."""
+    session = get_db_session()
+    try:
+        session.query(SearchTask).filter(SearchTask.task_id == task_id).update(
+            {
+                "refined_query": refined_query,
+                "search_items": json.dumps(search_items),
+                "llm_usage": json.dumps(usage_calls),
+            }
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+def save_page_summaries(task_id, results):
+    """Store the summaries of a task's pages, replacing earlier attempts."""
+    if not results:
+        return
+
+    session = get_db_session()
+    try:
+        session.query(SummarizedPage).filter(
+            SummarizedPage.task_id == task_id,
+            SummarizedPage.page_order.in_([result["order"] for result in results]),
+        ).delete(synchronize_session=False)
+        session.execute(
+            insert(SummarizedPage),
+            [
+                {
+                    "task_id": task_id,
+                    "page_order": result["order"],
+                    "link": result["link"],
+                    "title": result["title"],
+                    "summary": result["summary"],
+                    "llm_usage": json.dumps(result.get("usage_calls", [])),
+                }
+                for result in results
+            ],
+        )
+        session.commit()
+    except IntegrityError as e:
+        # A redelivered copy of the same stage has stored them concurrently
+        session.rollback()
+        logging.warning(f"Page summaries of task {task_id} already stored: {e}")
+    finally:
+        session.close()
+
+
+def load_page_summaries(task_id):
+    """Return the stored page summaries of a task as search results."""
+    session = get_db_session()
+    try:
+        return [
+            {
+                "order": page.page_order,
+                "link": page.link,
+                "title": page.title,
+                "summary": page.summary,
+                "usage_calls": json.loads(page.llm_usage or "[]"),
+            }
+            for page in session.query(SummarizedPage)
+            .filter(SummarizedPage.task_id == task_id)
+            .order_by(SummarizedPage.page_order)
+        ]
+    finally:
+        session.close()
+
+
+def add_relevant_posts(session, task_id, relevant_posts):
+    """Stage the relevant posts of a task as one bulk INSERT in the caller's
+    transaction.
+    """
+    if not relevant_posts:
+        return
+
+    session.execute(
+        insert(RelevantPost),
+        [
+            {
+                "task_id": task_id,
+                "title": post.get("title", "Untitled"),
+                "link": post.get("link", ""),
+            }
+            for post in relevant_posts
+        ],
+    )
+
+
+def load_stored_summary(task_id):
+    """Return the stored analysis, relevant posts and email of a synthesized task."""
+    session = get_db_session()
+    try:
+        task_record = (
+            session.query(SearchTask).filter(SearchTask.task_id == task_id).first()
+        )
+        relevant_posts = [
+            {"title": post.title, "link": post.link}
+            for post in session.query(RelevantPost)
+            .filter(RelevantPost.task_id == task_id)
+            .order_by(RelevantPost.id)
+        ]
+        return {
+            "analysis": task_record.analysis,
+            "relevant_posts": relevant_posts,
+            "email": task_record.email,
+        }
+    finally:
+        session.close()
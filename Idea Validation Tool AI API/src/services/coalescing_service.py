@@ -0,0 +1,187 @@
+import os
+import hashlib
+import logging
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client
+from src.services.search_cache_service import normalize_search_term
+
+# region Load environment variables
+
+load_dotenv()
+
+REQUEST_COALESCING_ENABLED = (
+    os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+)
+# Idle window of a pipeline run, refreshed at every stage and on every join. A
+# crashed leader stops attracting followers once it has passed.
+REQUEST_COALESCING_TTL_SECONDS = int(os.getenv("REQUEST_COALESCING_TTL_SECONDS", "900"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+IN_FLIGHT_KEY_PREFIX = "inflight:v1:"
+SUBSCRIBERS_KEY_PREFIX = "inflight:subscribers:"
+STATS_KEY = "inflight:stats"
+
+# Either attaches the subscriber to the running pipeline and returns its task
+# ID, or registers the caller as the leader and returns nil
+JOIN_SCRIPT = """
+local leader = redis.call('GET', KEYS[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+if leader then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    redis.call('HINCRBY', KEYS[3], 'coalesced', 1)
+    return leader
+end
+
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('HINCRBY', KEYS[3], 'leaders', 1)
+return false
+"""
+
+# Extends the in-flight window of a leader that is still making progress
+REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+# Ends the in-flight window of the leader and returns every subscriber. Nothing
+# is released if the key has meanwhile been taken over by another leader.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return {}
+end
+
+local subscribers = redis.call('SMEMBERS', KEYS[2])
+redis.call('DEL', KEYS[1], KEYS[2])
+return subscribers
+"""
+
+
+def build_request_fingerprint(query, problem_statement, target_audience):
+    """Hash the normalized request fields that determine the results."""
+    raw_key = "\x1f".join(
+        normalize_search_term(value)
+        for value in (query, problem_statement, target_audience)
+    )
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def _normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def join_in_flight_request(fingerprint, task_id, user_email):
+    """Attach a request to an identical in-flight pipeline, or lead a new one.
+
+    Returns the task ID of the running pipeline the subscriber was added to,
+    or None if the caller should start the pipeline under task_id itself.
+    Redis failures never block a request, the caller then simply leads.
+    """
+    if not REQUEST_COALESCING_ENABLED:
+        return None
+
+    try:
+        client = get_redis_client()
+        leader_task_id = client.eval(
+            JOIN_SCRIPT,
+            3,
+            IN_FLIGHT_KEY_PREFIX + fingerprint,
+            SUBSCRIBERS_KEY_PREFIX + fingerprint,
+            STATS_KEY,
+            task_id,
+            _normalize_email(user_email),
+            REQUEST_COALESCING_TTL_SECONDS,
+        )
+    except RedisError as e:
+        logging.warning(f"Request coalescing unavailable: {e}")
+        return None
+
+    return leader_task_id.decode("utf-8") if leader_task_id else None
+
+
+def refresh_in_flight_request(fingerprint, task_id):
+    """Keep the in-flight window of a running pipeline open for another TTL.
+
+    Called at every stage boundary, so a slow but healthy pipeline keeps
+    attracting followers.
+    """
+    if not fingerprint:
+        return
+
+    try:
+        get_redis_client().eval(
+            REFRESH_SCRIPT,
+            2,
+            IN_FLIGHT_KEY_PREFIX + fingerprint,
+            SUBSCRIBERS_KEY_PREFIX + fingerprint,
+            task_id,
+            REQUEST_COALESCING_TTL_SECONDS,
+        )
+    except RedisError as e:
+        logging.warning(f"Failed to refresh in-flight request {task_id}: {e}")
+
+
+def release_in_flight_request(fingerprint, task_id):
+    """Close the in-flight window of a pipeline and return its subscribers.
+
+    Requests arriving afterwards start a new pipeline.
+    """
+    if not fingerprint:
+        return []
+
+    try:
+        subscribers = get_redis_client().eval(
+            RELEASE_SCRIPT,
+            2,
+            IN_FLIGHT_KEY_PREFIX + fingerprint,
+            SUBSCRIBERS_KEY_PREFIX + fingerprint,
+            task_id,
+        )
+    except RedisError as e:
+        logging.warning(f"Failed to release in-flight request {task_id}: {e}")
+        return []
+
+    return sorted(subscriber.decode("utf-8") for subscriber in subscribers)
+
+
+def build_recipients(user_email, subscribers):
+    """Return the leader's email followed by the other subscribers, once each."""
+    recipients = [user_email]
+    seen = {_normalize_email(user_email)}
+    for subscriber in subscribers:
+        if subscriber not in seen:
+            seen.add(subscriber)
+            recipients.append(subscriber)
+    return recipients
+
+
+def get_coalescing_stats():
+    """Return how many requests led a pipeline and how many were coalesced."""
+    stats = get_redis_client().hgetall(STATS_KEY)
+    leaders = int(stats.get(b"leaders", 0))
+    coalesced = int(stats.get(b"coalesced", 0))
+    requests = leaders + coalesced
+
+    return {
+        "enabled": REQUEST_COALESCING_ENABLED,
+        "ttl_seconds": REQUEST_COALESCING_TTL_SECONDS,
+        "leaders": leaders,
+        "coalesced": coalesced,
+        "coalesced_rate": round(coalesced / requests, 4) if requests else 0.0,
+    }
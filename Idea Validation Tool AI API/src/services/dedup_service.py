@@ -0,0 +1,167 @@
+import os
+import re
+import hashlib
+import logging
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client
+from src.services.page_cache_service import canonicalize_url
+
+# region Load environment variables
+
+load_dotenv()
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_MAX_HAMMING_DISTANCE = int(os.getenv("DEDUP_MAX_HAMMING_DISTANCE", "3"))
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "50"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+FINGERPRINTS_KEY_PREFIX = "dedup:"
+LOCK_KEY_PREFIX = "dedup:lock:"
+
+# Fingerprints only matter while the chord of one task is running
+FINGERPRINTS_TTL_SECONDS = 3600
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def compute_simhash(text):
+    """Return the 64-bit SimHash of a text over its word 3-shingles.
+
+    Texts too short to fingerprint reliably, such as error or consent pages,
+    return None and are never treated as duplicates.
+    """
+    words = WORD_PATTERN.findall((text or "").lower())
+    if len(words) < DEDUP_MIN_WORDS:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for i in range(len(words) - SHINGLE_SIZE + 1):
+        shingle = " ".join(words[i : i + SHINGLE_SIZE])
+        shingle_hash = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if shingle_hash >> bit & 1 else -1
+
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def is_near_duplicate(fingerprint, other_fingerprint):
+    """Check whether two fingerprints are within the configured distance."""
+    if fingerprint is None or other_fingerprint is None:
+        return False
+    return (fingerprint ^ other_fingerprint).bit_count() <= DEDUP_MAX_HAMMING_DISTANCE
+
+
+def find_duplicate_of(fingerprint, fingerprints):
+    """Return the order of the first near-duplicate in {order: fingerprint}."""
+    for order, other_fingerprint in fingerprints.items():
+        if is_near_duplicate(fingerprint, other_fingerprint):
+            return order
+    return None
+
+
+def register_task_page(task_id, order, text):
+    """Register a fetched page of a task and return the order it duplicates.
+
+    The first page to arrive survives. Fingerprints are kept in a Redis hash
+    per task so pages fetched by different workers are compared. On Redis
+    failure the page is kept.
+    """
+    if not DEDUP_ENABLED:
+        return None
+
+    fingerprint = compute_simhash(text)
+    if fingerprint is None:
+        return None
+
+    key = FINGERPRINTS_KEY_PREFIX + task_id
+    try:
+        client = get_redis_client()
+        with client.lock(LOCK_KEY_PREFIX + task_id, timeout=10, blocking_timeout=5):
+            fingerprints = {
+                int(field): int(value) for field, value in client.hgetall(key).items()
+            }
+            # A retried fetch of the same page must not match itself
+            fingerprints.pop(order, None)
+            duplicate_of = find_duplicate_of(fingerprint, fingerprints)
+            if duplicate_of is None:
+                pipeline = client.pipeline()
+                pipeline.hset(key, order, fingerprint)
+                pipeline.expire(key, FINGERPRINTS_TTL_SECONDS)
+                pipeline.execute()
+        return duplicate_of
+    except RedisError as e:
+        logging.warning(f"Page dedup check failed for task {task_id}: {e}")
+        return None
+
+
+def clear_task_pages(task_id):
+    """Drop the fingerprints of a finished task."""
+    try:
+        get_redis_client().delete(FINGERPRINTS_KEY_PREFIX + task_id)
+    except RedisError as e:
+        logging.warning(f"Page dedup cleanup failed for task {task_id}: {e}")
+
+
+def merge_duplicates(results, duplicates):
+    """Attach dropped duplicates to their surviving results as duplicate_links.
+
+    duplicates is a list of (duplicate_of, item) pairs, where duplicate_of is
+    the order of the surviving result.
+    """
+    results_by_order = {result["order"]: result for result in results}
+    for duplicate_of, item in duplicates:
+        survivor = results_by_order.get(duplicate_of)
+        if survivor is None:
+            continue
+        survivor.setdefault("duplicate_links", []).append(
+            {
+                "title": item.get("title") or item.get("snippet", ""),
+                "link": item.get("link"),
+            }
+        )
+    return results
+
+
+def expand_relevant_posts(relevant_posts, results):
+    """Add the duplicates of every cited result to the relevant posts.
+
+    Near-duplicates are never shown to the LLM, so their links are appended
+    after the post of the result they were merged into.
+    """
+    duplicates_by_link = {
+        canonicalize_url(result["link"]): result["duplicate_links"]
+        for result in results
+        if result.get("link") and result.get("duplicate_links")
+    }
+    if not duplicates_by_link:
+        return relevant_posts
+
+    expanded = []
+    seen_links = set()
+    for post in relevant_posts:
+        for entry in [post] + duplicates_by_link.get(
+            canonicalize_url(post.get("link") or ""), []
+        ):
+            link = entry.get("link")
+            if link:
+                link = canonicalize_url(link)
+                if link in seen_links:
+                    continue
+                seen_links.add(link)
+            expanded.append(entry)
+    return expanded
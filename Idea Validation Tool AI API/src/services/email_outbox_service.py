@@ -0,0 +1,329 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import func, update
+from src.models import get_db_session, SearchTask, EmailOutbox
+
+# region Load environment variables
+
+load_dotenv()
+
+CLIENT_APP_HOMEPAGE_URL = os.getenv("CLIENT_APP_HOMEPAGE_URL")
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "60"))
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = int(
+    os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600")
+)
+# Claimed emails are hidden from other senders for this long, a sender that
+# dies mid-batch therefore only delays its emails
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+RESULTS_EMAIL_SUBJECT = "Your Idea Validation Results"
+
+
+def add_to_outbox(session, task_id, recipients, subject, body):
+    """Stage emails of a task in the caller's session and transaction.
+
+    Recipients that already have an email for the task are skipped.
+    """
+    queued = {
+        recipient
+        for (recipient,) in session.query(EmailOutbox.recipient).filter(
+            EmailOutbox.task_id == task_id
+        )
+    }
+    for recipient in recipients:
+        if recipient not in queued:
+            queued.add(recipient)
+            session.add(
+                EmailOutbox(
+                    task_id=task_id,
+                    recipient=recipient,
+                    subject=subject,
+                    body=body,
+                    status="PENDING",
+                    attempts=0,
+                    next_attempt_at=datetime.utcnow(),
+                )
+            )
+
+
+def enqueue_emails(task_id, recipients, subject, body):
+    """Queue emails of a task in their own transaction."""
+    if not recipients:
+        return
+
+    session = get_db_session()
+    try:
+        add_to_outbox(session, task_id, recipients, subject, body)
+        session.commit()
+    finally:
+        session.close()
+
+
+def requeue_task_emails(task_id):
+    """Make the failed emails of a task due again.
+
+    Returns the number of emails the task has in the outbox.
+    """
+    session = get_db_session()
+    try:
+        session.query(EmailOutbox).filter(
+            EmailOutbox.task_id == task_id, EmailOutbox.status == "FAILED"
+        ).update(
+            {"status": "PENDING", "attempts": 0, "next_attempt_at": datetime.utcnow()}
+        )
+        session.commit()
+        return session.query(EmailOutbox).filter(EmailOutbox.task_id == task_id).count()
+    finally:
+        session.close()
+
+
+def claim_due_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """Lease a batch of due emails to this sender.
+
+    Rows locked by a concurrent sender are skipped, so several senders can
+    drain the outbox at once without sending an email twice.
+    """
+    now = datetime.utcnow()
+    session = get_db_session()
+    try:
+        emails = (
+            session.query(EmailOutbox)
+            .filter(EmailOutbox.status == "PENDING", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for email in emails:
+            email.next_attempt_at = now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)
+            claimed.append(
+                {
+                    "id": email.id,
+                    "task_id": email.task_id,
+                    "recipient": email.recipient,
+                    "subject": email.subject,
+                    "body": email.body,
+                    "attempts": email.attempts or 0,
+                }
+            )
+        session.commit()
+        return claimed
+    finally:
+        session.close()
+
+
+def _backoff_seconds(attempts):
+    return min(
+        EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+    )
+
+
+def record_delivery_results(emails, errors):
+    """Mark claimed emails as sent or schedule their retry, then settle their tasks.
+
+    A task succeeds once the email to its owner is sent and fails once that
+    email has used up its attempts. Emails to coalesced subscribers never
+    change the task status.
+    """
+    now = datetime.utcnow()
+    updates = []
+    for email, error in zip(emails, errors):
+        if error is None:
+            updates.append(
+                {
+                    "id": email["id"],
+                    "status": "SENT",
+                    "sent_at": now,
+                    "last_error": None,
+                }
+            )
+            continue
+
+        attempts = email["attempts"] + 1
+        if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logging.error(
+                f"Giving up on the email of task {email['task_id']} to {email['recipient']}"
+            )
+            updates.append(
+                {
+                    "id": email["id"],
+                    "status": "FAILED",
+                    "attempts": attempts,
+                    "last_error": error,
+                }
+            )
+        else:
+            updates.append(
+                {
+                    "id": email["id"],
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now
+                    + timedelta(seconds=_backoff_seconds(attempts)),
+                }
+            )
+
+    session = get_db_session()
+    try:
+        # Bulk UPDATE by primary key, one executemany per kind of outcome
+        session.execute(update(EmailOutbox), updates)
+
+        for task_id in {email["task_id"] for email in emails}:
+            _settle_task(session, task_id, now)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _settle_task(session, task_id, now):
+    owner_email_status = (
+        session.query(EmailOutbox.status)
+        .join(SearchTask, SearchTask.task_id == EmailOutbox.task_id)
+        .filter(
+            EmailOutbox.task_id == task_id, EmailOutbox.recipient == SearchTask.email
+        )
+        .scalar()
+    )
+
+    task_query = session.query(SearchTask).filter(
+        SearchTask.task_id == task_id, SearchTask.email_sent_at.is_(None)
+    )
+    if owner_email_status == "FAILED":
+        task_query.update({"status": "FAILURE", "completed_at": now})
+    elif owner_email_status == "SENT":
+        task_query.update(
+            {"status": "SUCCESS", "email_sent_at": now, "completed_at": now}
+        )
+        logging.info(f"The results email of task {task_id} has been sent")
+
+
+def get_outbox_stats():
+    """Return the number of emails per status and the age of the oldest due one.
+
+    failed_subscribers counts the given up emails to coalesced subscribers,
+    which do not fail their task.
+    """
+    session = get_db_session()
+    try:
+        counts = dict(
+            session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+            .group_by(EmailOutbox.status)
+            .all()
+        )
+        failed_subscribers = (
+            session.query(func.count(EmailOutbox.id))
+            .join(SearchTask, SearchTask.task_id == EmailOutbox.task_id)
+            .filter(
+                EmailOutbox.status == "FAILED",
+                EmailOutbox.recipient != SearchTask.email,
+            )
+            .scalar()
+        )
+        oldest_pending = (
+            session.query(func.min(EmailOutbox.created_at))
+            .filter(EmailOutbox.status == "PENDING")
+            .scalar()
+        )
+    finally:
+        session.close()
+
+    return {
+        "pending": counts.get("PENDING", 0),
+        "sent": counts.get("SENT", 0),
+        "failed": counts.get("FAILED", 0),
+        "failed_subscribers": failed_subscribers,
+        "oldest_pending_seconds": (
+            round((datetime.utcnow() - oldest_pending).total_seconds(), 1)
+            if oldest_pending
+            else None
+        ),
+    }
+
+
+def format_relevant_posts(posts):
+    """Formats links as clickable text with titles instead of displaying raw URLs."""
+    if not posts:
+        return "<p>No relevant posts found.</p>"
+
+    formatted_links = ""
+    for post in posts:
+        title = post.get("title", "Untitled Article")
+        url = post.get("link")
+        formatted_links += f'<li><a href="{url}" target="_blank">{title}</a></li>'
+    return formatted_links
+
+
+def render_results_email(user_query, analysis, relevant_posts):
+    """Format the HTML email with the search results."""
+    # Get current year
+    current_year = datetime.now().year
+
+    # Format email content with HTML
+    email_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <body style="font-family: 'Google Sans', Verdana, sans-serif; color: #333; line-height: 1.6; background-color: #f4f4f4; margin: 0; padding: 20px;">
+        <div style="max-width: 600px; margin: 20px auto; padding: 20px; border: 1px solid #ddd; border-radius: 8px; background: #ffffff; box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);">
+            <div style="color: #4084f4; border-bottom: 2px solid #ddd; padding-bottom: 5px; margin-bottom: 20px;">
+                <h2 style="font-size: 22px;margin-top: 0;">Dassyor AI Search Analysis</h2>
+            </div>
+
+            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
+                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Analysis</h3>
+                <p style="font-size: 16px;margin-bottom: 0;white-space: pre-wrap;">{analysis}</p>
+            </div>
+
+            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
+                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Relevant Resources</h3>
+                <ul style="padding-left: 20px;font-size: 16px;">
+                    {format_relevant_posts(relevant_posts)}
+                </ul>
+            </div>
+
+            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
+                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Next Step</h3>
+                <p style="font-size: 16px;margin-top: 0;margin-bottom: 0;">
+                    Startups face numerous challenges, and your tool has the potential to
+                    make a real impact in solving them. To refine and validate your idea
+                    further, explore the idea validation phase on Dassyor. Our advanced AI
+                    will provide insights and guidance to help you shape your concept
+                    effectively. This phase is completely free, and you can get started by
+                    signing up <a href="{CLIENT_APP_HOMEPAGE_URL}" target="_blank" style="color: #4084f4; text-decoration: none; font-weight: bold;">here</a>.
+                </p>
+            </div>
+
+            <div style="margin-top: 20px; font-size: 12px; color: #666; text-align: center;">
+                <p>This email was generated automatically by Dassyor AI.</p>
+                <p>&copy; {current_year} Dassyor. All rights reserved.</p>
+                <p>Tashkent, Uzbekistan</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    return email_body
+
+
+# Optional (removed from the final code)
+# <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);font-size: 16px;">
+#     <strong style="color: #4084f4;">Your search query:</strong>
+#     <em>{user_query}</em>
+# </div>
@@ -1,10 +1,13 @@
 import os
+import time
 import logging
 import smtplib
+import threading
 from dotenv import load_dotenv
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
+from src.services.metrics_service import track_stage
 
 # region Load environment variables
 
@@ -15,6 +18,17 @@ SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
 SENDER_HOST = os.getenv("SENDER_HOST")
 SENDER_PORT = os.getenv("SENDER_PORT")
 SENDER_NAME = os.getenv("SENDER_NAME")
+# "ssl" for implicit TLS, "starttls" to upgrade a plain connection, or "none"
+SENDER_SECURITY = os.getenv("SENDER_SECURITY", "ssl").lower()
+
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+# Idle sessions kept per worker process, 0 opens a session per message
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Most servers drop idle clients after a few minutes, close them before that
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+# Sessions idle for longer are checked with NOOP before they are reused
+SMTP_NOOP_AFTER_IDLE_SECONDS = float(os.getenv("SMTP_NOOP_AFTER_IDLE_SECONDS", "5"))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", "100"))
 
 # endregion
 
@@ -26,21 +40,237 @@ logging.basicConfig(
 
 # endregion
 
+# Reply code of a server that is closing the session, e.g. on idle timeout
+SERVICE_NOT_AVAILABLE_CODE = 421
 
-def send_email(receiver_email, subject, body, is_html=True):
-    """Sends an email to the specified receiver."""
+
+class SMTPSessionUnavailable(Exception):
+    """No session to the SMTP server could be opened."""
+
+
+def open_smtp_connection():
+    """Connect and log in to the configured SMTP server."""
+    if SENDER_SECURITY == "ssl":
+        server = smtplib.SMTP_SSL(
+            SENDER_HOST, int(SENDER_PORT), timeout=SMTP_TIMEOUT_SECONDS
+        )
+    else:
+        server = smtplib.SMTP(
+            SENDER_HOST, int(SENDER_PORT), timeout=SMTP_TIMEOUT_SECONDS
+        )
+        if SENDER_SECURITY == "starttls":
+            server.starttls()
+
+    try:
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def _is_connection_lost(error):
+    """Tell whether an error means the session is unusable and worth redoing."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if getattr(error, "smtp_code", None) == SERVICE_NOT_AVAILABLE_CODE:
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(
+            code == SERVICE_NOT_AVAILABLE_CODE for code, _ in error.recipients.values()
+        )
+    # Socket errors, SMTPException itself subclasses OSError
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class PooledSMTPConnection:
+    """An authenticated SMTP session with its usage bookkeeping."""
+
+    def __init__(self, server):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    def is_alive(self):
+        """Check the session with a NOOP round trip."""
+        try:
+            return self.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+
+
+class SMTPConnectionPool:
+    """Reuses authenticated SMTP sessions across the messages of a process.
+
+    Idle sessions are reused newest first, so the oldest ones expire on their
+    own when traffic drops. A session is retired after max_messages messages
+    or max_idle_seconds without use.
+    """
+
+    def __init__(
+        self,
+        max_idle_connections=SMTP_POOL_SIZE,
+        max_idle_seconds=SMTP_MAX_IDLE_SECONDS,
+        max_messages=SMTP_MAX_MESSAGES_PER_SESSION,
+        noop_after_idle_seconds=SMTP_NOOP_AFTER_IDLE_SECONDS,
+        connect=open_smtp_connection,
+    ):
+        self.max_idle_connections = max_idle_connections
+        self.max_idle_seconds = max_idle_seconds
+        self.max_messages = max_messages
+        self.noop_after_idle_seconds = noop_after_idle_seconds
+        self._connect = connect
+        self._idle = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _open(self):
+        try:
+            with track_stage("smtp_connect"):
+                server = self._connect()
+        except Exception as e:
+            raise SMTPSessionUnavailable(f"Cannot open an SMTP session: {e}") from e
+        self.connections_opened += 1
+        return PooledSMTPConnection(server)
+
+    def acquire(self):
+        """Return a healthy idle session, or open a new one."""
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._open()
+
+            idle_seconds = time.monotonic() - connection.last_used
+            if idle_seconds > self.max_idle_seconds:
+                connection.close()
+                continue
+            if (
+                idle_seconds > self.noop_after_idle_seconds
+                and not connection.is_alive()
+            ):
+                connection.close()
+                continue
+            return connection
+
+    def release(self, connection, reusable=True):
+        """Return a session to the pool, or close it if it should be retired."""
+        connection.last_used = time.monotonic()
+        if reusable and connection.messages_sent < self.max_messages:
+            with self._lock:
+                if len(self._idle) < self.max_idle_connections:
+                    self._idle.append(connection)
+                    return
+        connection.close()
+
+    def sendmail(self, sender, receiver, message):
+        """Send one message, redoing it once on a fresh session if the
+        server has dropped the connection or answered 421.
+        """
+        for attempt in (1, 2):
+            connection = self.acquire()
+            try:
+                with track_stage("smtp"):
+                    connection.server.sendmail(sender, receiver, message)
+            except Exception as e:
+                lost = _is_connection_lost(e)
+                self.release(connection, reusable=not lost)
+                if lost and attempt == 1:
+                    logging.info(f"SMTP session lost ({e}), reconnecting")
+                    continue
+                raise
+
+            connection.messages_sent += 1
+            self.release(connection)
+            return
+
+    def close_all(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+# region Per-process state
+
+# Sessions are owned by a single worker process, a forked child starts with
+# an empty pool instead of sharing its parent's sockets.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# endregion
+
+
+def _reset_after_fork():
+    global _pool, _pool_pid, _pool_lock
+
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_smtp_pool():
+    """Return the SMTP connection pool of the current worker process."""
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = SMTPConnectionPool()
+            _pool_pid = pid
+    return _pool
+
+
+def build_message(receiver_email, subject, body, is_html=True):
+    """Build the MIME message of an email from the configured sender."""
     message = MIMEMultipart()
     message["From"] = formataddr((SENDER_NAME, SENDER_EMAIL))
     message["To"] = receiver_email
     message["Subject"] = subject
     message.attach(MIMEText(body, "html" if is_html else "plain"))
+    return message
 
-    try:
-        with smtplib.SMTP_SSL(SENDER_HOST, int(SENDER_PORT)) as server:
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.sendmail(SENDER_EMAIL, receiver_email, message.as_string())
-        logging.info(f"Email sent successfully to {receiver_email}")
-        return True
-    except Exception as e:
-        logging.error(f"Failed to send email to {receiver_email}: {e}")
-        return False
+
+def send_email(receiver_email, subject, body, is_html=True):
+    """Sends an email to the specified receiver."""
+    return send_email_batch([(receiver_email, subject, body)], is_html)[0] is None
+
+
+def send_email_batch(emails, is_html=True, pool=None):
+    """Send (receiver, subject, body) emails over the pooled SMTP sessions.
+
+    Returns one entry per email, None if it was sent, otherwise the error
+    message. If the server cannot be reached the rest of the batch fails
+    at once instead of timing out email by email.
+    """
+    pool = pool or get_smtp_pool()
+
+    errors = []
+    for receiver_email, subject, body in emails:
+        message = build_message(receiver_email, subject, body, is_html)
+        try:
+            pool.sendmail(SENDER_EMAIL, receiver_email, message.as_string())
+            logging.info(f"Email sent successfully to {receiver_email}")
+            errors.append(None)
+        except SMTPSessionUnavailable as e:
+            logging.error(f"{e}, {len(emails) - len(errors)} email(s) not sent")
+            errors.extend([str(e)] * (len(emails) - len(errors)))
+            break
+        except Exception as e:
+            logging.error(f"Failed to send email to {receiver_email}: {e}")
+            errors.append(str(e))
+    return errors
@@ -0,0 +1,148 @@
+import os
+import re
+import logging
+import numpy as np
+from dotenv import load_dotenv
+from src.services.token_budget_service import count_tokens, trim_to_token_budget
+
+# region Load environment variables
+
+load_dotenv()
+
+EXTRACTIVE_COMPRESSION_ENABLED = (
+    os.getenv("EXTRACTIVE_COMPRESSION_ENABLED", "true").lower() == "true"
+)
+EXTRACTIVE_TOKEN_BUDGET = int(os.getenv("EXTRACTIVE_TOKEN_BUDGET", "600"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+# Weight of the query match in a sentence score, the rest rewards sentences
+# close to the page centroid so pages with few query terms still rank well
+QUERY_WEIGHT = 0.7
+
+MIN_SENTENCE_WORDS = 5
+MAX_SENTENCE_WORDS = 80
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def split_sentences(text):
+    """Split page text into sentences, dropping fragments like menu items."""
+    sentences = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text or ""):
+        words = sentence.split()
+        if len(words) < MIN_SENTENCE_WORDS:
+            continue
+        # Unpunctuated walls of text are cut into sentence-sized pieces
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentences.append(" ".join(words[start : start + MAX_SENTENCE_WORDS]))
+    return sentences
+
+
+def score_sentences(sentences, search_query):
+    """Score sentences by TF-IDF similarity to the query and the page centroid.
+
+    The term matrix is kept as parallel (sentence, term, weight) arrays, so
+    whole pages are scored without building a dense sentences x vocabulary
+    matrix.
+    """
+    vocabulary = {}
+    sentence_ids, term_ids = [], []
+    for sentence_id, sentence in enumerate(sentences):
+        for word in WORD_PATTERN.findall(sentence.lower()):
+            sentence_ids.append(sentence_id)
+            term_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    if not term_ids:
+        return np.zeros(len(sentences))
+
+    # Collapse repeated (sentence, term) pairs into term frequencies
+    pairs, term_counts = np.unique(
+        np.array(sentence_ids, dtype=np.int64) * len(vocabulary)
+        + np.array(term_ids, dtype=np.int64),
+        return_counts=True,
+    )
+    sentence_ids, term_ids = np.divmod(pairs, len(vocabulary))
+
+    document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    weights = (1 + np.log(term_counts)) * idf[term_ids]
+
+    norms = np.sqrt(
+        np.bincount(sentence_ids, weights=weights**2, minlength=len(sentences))
+    )
+    weights = weights / norms[sentence_ids]
+
+    # Similarity to the centroid of all sentences
+    centroid = np.bincount(term_ids, weights=weights, minlength=len(vocabulary))
+    centroid /= np.linalg.norm(centroid) or 1
+    centroid_scores = np.bincount(
+        sentence_ids, weights=weights * centroid[term_ids], minlength=len(sentences)
+    )
+
+    # Similarity to the query, words missing from the page carry no weight
+    query = np.zeros(len(vocabulary))
+    for word in WORD_PATTERN.findall((search_query or "").lower()):
+        if word in vocabulary:
+            query[vocabulary[word]] = idf[vocabulary[word]]
+    query /= np.linalg.norm(query) or 1
+    query_scores = np.bincount(
+        sentence_ids, weights=weights * query[term_ids], minlength=len(sentences)
+    )
+
+    return QUERY_WEIGHT * query_scores + (1 - QUERY_WEIGHT) * centroid_scores
+
+
+def _select_sentences(sentences, scores, costs, budget):
+    """Join the best scoring sentences that fit the budget, in page order."""
+    selected = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if used + costs[index] <= budget:
+            selected.append(index)
+            used += costs[index]
+
+    return " ".join(sentences[index] for index in sorted(selected))
+
+
+def compress_text(text, search_query, token_budget=EXTRACTIVE_TOKEN_BUDGET):
+    """Keep only the sentences most relevant to the query within a token budget.
+
+    Texts without usable sentences are trimmed to the budget instead.
+    """
+    if not text or count_tokens(text) <= token_budget:
+        return text
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return trim_to_token_budget(text, token_budget)
+
+    scores = score_sentences(sentences, search_query)
+    # One extra token for the joining space
+    costs = [count_tokens(sentence) + 1 for sentence in sentences]
+    compressed = _select_sentences(sentences, scores, costs, token_budget)
+    return compressed or trim_to_token_budget(text, token_budget)
+
+
+def summarize_locally(text, search_query, character_limit=700):
+    """Build an extractive summary of at most character_limit characters.
+
+    Used when the LLM is unavailable, so results can still be delivered.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return (text or "")[:character_limit].strip() or None
+
+    scores = score_sentences(sentences, search_query)
+    costs = [len(sentence) + 1 for sentence in sentences]
+    summary = _select_sentences(sentences, scores, costs, character_limit)
+    return summary or sentences[int(np.argmax(scores))][:character_limit]
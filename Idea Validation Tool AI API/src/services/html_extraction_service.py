@@ -0,0 +1,113 @@
+import os
+import logging
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+# Fast parsers are optional, BeautifulSoup is always available as a fallback
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# region Load environment variables
+
+load_dotenv()
+
+HTML_EXTRACTION_ENGINE = os.getenv("HTML_EXTRACTION_ENGINE", "auto").lower()
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+# Elements whose text never belongs in the page content
+IGNORED_TAGS = ("script", "style")
+
+# Engines in order of preference for the "auto" setting
+ENGINE_PREFERENCE = ("lxml", "selectolax", "bs4")
+
+
+def _extract_with_bs4(html):
+    """Extract visible text with BeautifulSoup and the pure-Python parser."""
+    soup = BeautifulSoup(html, "html.parser")
+    for script_or_style in soup(list(IGNORED_TAGS)):
+        script_or_style.decompose()
+
+    return soup.get_text(separator=" ", strip=True)
+
+
+def _extract_with_lxml(html):
+    """Extract visible text with lxml's libxml2-based HTML parser."""
+    if isinstance(html, str):
+        # lxml refuses str input that carries an XML encoding declaration
+        html = html.encode("utf-8")
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+    else:
+        parser = None
+
+    document = lxml.html.document_fromstring(html, parser=parser)
+    etree.strip_elements(document, *IGNORED_TAGS, with_tail=False)
+
+    return " ".join(
+        fragment.strip() for fragment in document.itertext() if fragment.strip()
+    )
+
+
+def _extract_with_selectolax(html):
+    """Extract visible text with selectolax's Lexbor-based parser."""
+    tree = HTMLParser(html)
+    tree.strip_tags(list(IGNORED_TAGS))
+    if tree.root is None:
+        return ""
+
+    return tree.root.text(separator=" ", strip=True)
+
+
+EXTRACTION_ENGINES = {"bs4": _extract_with_bs4}
+if lxml is not None:
+    EXTRACTION_ENGINES["lxml"] = _extract_with_lxml
+if HTMLParser is not None:
+    EXTRACTION_ENGINES["selectolax"] = _extract_with_selectolax
+
+
+def get_available_engines():
+    """Return the names of the installed extraction engines, fastest first."""
+    return [name for name in ENGINE_PREFERENCE if name in EXTRACTION_ENGINES]
+
+
+def resolve_engine(name=None):
+    """Resolve an engine name, falling back to the fastest installed engine."""
+    name = (name or HTML_EXTRACTION_ENGINE).lower()
+    if name in EXTRACTION_ENGINES:
+        return name
+
+    if name != "auto":
+        logging.warning(f"HTML extraction engine '{name}' is not available")
+    return get_available_engines()[0]
+
+
+def extract_text(html, engine=None):
+    """Extract the visible text of an HTML document.
+
+    Uses the configured engine and falls back to BeautifulSoup if the fast
+    parser cannot handle the document.
+    """
+    engine_name = resolve_engine(engine)
+    try:
+        return EXTRACTION_ENGINES[engine_name](html)
+    except Exception as e:
+        if engine_name == "bs4":
+            raise
+        logging.warning(f"{engine_name} extraction failed, using bs4: {e}")
+        return _extract_with_bs4(html)
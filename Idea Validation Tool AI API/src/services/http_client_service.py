@@ -0,0 +1,294 @@
+import os
+import time
+import socket
+import logging
+import threading
+import requests
+import urllib3.util.connection as urllib3_connection
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from src.services.metrics_service import (
+    HTTP_REQUESTS,
+    HTTP_CONNECTIONS_OPENED,
+    HTTP_DNS_CACHE_HITS,
+)
+
+# region Load environment variables
+
+load_dotenv()
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "32"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF_FACTOR = float(os.getenv("HTTP_RETRY_BACKOFF_FACTOR", "0.5"))
+HTTP_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_RETRY_BACKOFF_MAX_SECONDS", "5"))
+HTTP_DNS_CACHE_TTL_SECONDS = float(os.getenv("HTTP_DNS_CACHE_TTL_SECONDS", "300"))
+# Google CSE may ask to wait with Retry-After, longer waits are not honored
+SEARCH_API_RETRY_AFTER_MAX_SECONDS = float(
+    os.getenv("SEARCH_API_RETRY_AFTER_MAX_SECONDS", "10")
+)
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Names of the pooled sessions, also the client label of their metrics
+PAGES_CLIENT = "pages"
+SEARCH_API_CLIENT = "search_api"
+
+# region Per-process state
+
+# Everything below is owned by a single worker process. It is rebuilt after a
+# fork so Celery prefork children never share sockets with their parent.
+_sessions = {}
+_sessions_pid = None
+_sessions_lock = threading.Lock()
+
+_dns_cache = {}
+_dns_cache_lock = threading.Lock()
+
+# endregion
+
+
+def _resolve_host(host, port):
+    """Resolve a host through the process-wide DNS cache."""
+    now = time.monotonic()
+    key = (host, port)
+
+    with _dns_cache_lock:
+        cached = _dns_cache.get(key)
+    if cached and cached[0] > now:
+        HTTP_DNS_CACHE_HITS.inc()
+        return cached[1]
+
+    addresses = []
+    for *_, sockaddr in socket.getaddrinfo(
+        host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM
+    ):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+
+    with _dns_cache_lock:
+        _dns_cache[key] = (now + HTTP_DNS_CACHE_TTL_SECONDS, addresses)
+    return addresses
+
+
+class _CachedDNSConnectionMixin:
+    """Opens the TCP connection to a cached IP address of the host.
+
+    TLS still uses the original host name for SNI and certificate checks, only
+    the TCP connect goes to the cached IP address.
+    """
+
+    client = PAGES_CLIENT
+
+    def _new_conn(self):
+        HTTP_CONNECTIONS_OPENED.labels(self.client).inc()
+        host = self._dns_host.strip("[]")
+        try:
+            addresses = _resolve_host(host, self.port)
+        except OSError:
+            # Let urllib3 resolve and report the failure itself
+            return super()._new_conn()
+
+        last_error = None
+        for ip_address in addresses:
+            self._dns_host = ip_address
+            try:
+                return super()._new_conn()
+            except OSError as e:
+                last_error = e
+            finally:
+                self._dns_host = host
+
+        # Cached addresses may have gone stale, resolve again on the next attempt
+        with _dns_cache_lock:
+            _dns_cache.pop((host, self.port), None)
+        if last_error:
+            raise last_error
+        return super()._new_conn()
+
+
+class CappedRetry(Retry):
+    """Retry that honors Retry-After, but never waits longer than retry_after_max."""
+
+    def __init__(self, *args, retry_after_max=HTTP_RETRY_BACKOFF_MAX_SECONDS, **kw):
+        super().__init__(*args, **kw)
+        self.retry_after_max = retry_after_max
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.retry_after_max = self.retry_after_max
+        return retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.retry_after_max)
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections use the process-wide DNS cache.
+
+    Only the pools of this adapter are affected, other urllib3 users in the
+    process keep resolving and connecting as usual.
+    """
+
+    def __init__(self, client, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        def pool_class(base_pool, base_connection):
+            connection_class = type(
+                f"CachedDNS{base_connection.__name__}",
+                (_CachedDNSConnectionMixin, base_connection),
+                {"client": self.client},
+            )
+            return type(
+                f"CachedDNS{base_pool.__name__}",
+                (base_pool,),
+                {"ConnectionCls": connection_class},
+            )
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": pool_class(HTTPConnectionPool, HTTPConnection),
+            "https": pool_class(HTTPSConnectionPool, HTTPSConnection),
+        }
+
+
+def _page_retry():
+    """No retries inside the page session, get_page retries within the deadline.
+
+    A Retry reuses the timeout of the first attempt for every later one, so a
+    retried fetch could run far past its budget.
+    """
+    return Retry(0, read=False)
+
+
+def _search_api_retry():
+    """Retries for the Google CSE API, waiting for Retry-After up to a cap."""
+    return CappedRetry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+        backoff_max=HTTP_RETRY_BACKOFF_MAX_SECONDS,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        retry_after_max=SEARCH_API_RETRY_AFTER_MAX_SECONDS,
+    )
+
+
+def _count_request(client):
+    def hook(response, *args, **kwargs):
+        HTTP_REQUESTS.labels(client).inc()
+
+    return hook
+
+
+def _build_session(client, retry):
+    """Create a pooled keep-alive session with the given retry policy."""
+    adapter = CachedDNSAdapter(
+        client,
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_count_request(client))
+    return session
+
+
+def _reset_after_fork():
+    """Forget the parent's sessions, sockets and DNS answers in a forked child."""
+    global _sessions_pid, _sessions_lock, _dns_cache_lock
+
+    _sessions.clear()
+    _sessions_pid = None
+    _sessions_lock = threading.Lock()
+    _dns_cache_lock = threading.Lock()
+    _dns_cache.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_session(client, build_retry):
+    global _sessions_pid
+
+    pid = os.getpid()
+    session = _sessions.get(client)
+    if session is not None and _sessions_pid == pid:
+        return session
+
+    with _sessions_lock:
+        if _sessions_pid != pid:
+            _sessions.clear()
+            _sessions_pid = pid
+        if client not in _sessions:
+            _sessions[client] = _build_session(client, build_retry())
+            logging.info(f"Created pooled {client} HTTP session for process {pid}")
+        return _sessions[client]
+
+
+def get_http_session():
+    """Return the shared page-fetch HTTP session of the current worker process."""
+    return _get_session(PAGES_CLIENT, _page_retry)
+
+
+def get_page(url, deadline=None, timeout=10, **kwargs):
+    """GET a page with the page session, retrying only while the deadline allows.
+
+    Every attempt is given the budget left at its start (epoch seconds
+    deadline) as timeout, and the short backoff between attempts ignores
+    Retry-After: sites answering 429 or 503 may ask for minutes, a fetch
+    thread must not sleep that long for a single page.
+    """
+    session = get_http_session()
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        attempt_timeout = timeout
+        if deadline is not None:
+            attempt_timeout = min(timeout, deadline - time.time())
+            if attempt_timeout <= 0:
+                raise requests.exceptions.Timeout("Fetch budget exhausted")
+
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        try:
+            response = session.get(url, timeout=attempt_timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if last_attempt:
+                raise
+        else:
+            if last_attempt or response.status_code not in RETRY_STATUS_CODES:
+                return response
+            response.close()
+
+        backoff = min(
+            HTTP_RETRY_BACKOFF_FACTOR * 2**attempt, HTTP_RETRY_BACKOFF_MAX_SECONDS
+        )
+        if deadline is not None:
+            backoff = min(backoff, max(deadline - time.time(), 0))
+        time.sleep(backoff)
+
+
+def get_search_api_session():
+    """Return the HTTP session for the Google CSE API of the current process."""
+    return _get_session(SEARCH_API_CLIENT, _search_api_retry)
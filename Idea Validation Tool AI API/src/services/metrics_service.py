@@ -0,0 +1,230 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    start_http_server,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from src.services.redis_service import get_redis_client
+
+# region Load environment variables
+
+load_dotenv()
+
+# Must be set before the process starts for gunicorn and prefork workers,
+# every process then writes its samples to this directory
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+# USD per million tokens, the defaults are the gpt-4o-mini list prices
+LLM_PROMPT_COST_PER_MILLION = float(os.getenv("LLM_PROMPT_COST_PER_MILLION", "0.15"))
+LLM_COMPLETION_COST_PER_MILLION = float(
+    os.getenv("LLM_COMPLETION_COST_PER_MILLION", "0.6")
+)
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+# Celery queues whose backlog is exported, see celery_config.py
+CELERY_QUEUES = ("default", "fetch", "parse", "llm", "email")
+
+# Published messages carry their enqueue time so workers can measure queue wait
+PUBLISHED_AT_HEADER = "published_at"
+
+# Stages range from cached lookups to minute-long LLM calls
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+# region Metrics
+
+STAGE_DURATION = Histogram(
+    "validation_stage_duration_seconds",
+    "Duration of one stage of the validation pipeline",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "validation_stage_errors_total",
+    "Stages of the validation pipeline that raised",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "validation_llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["stage", "model", "kind"],
+)
+LLM_COST = Counter(
+    "validation_llm_cost_usd_total",
+    "Estimated cost of LLM calls in USD",
+    ["stage", "model"],
+)
+TASK_QUEUE_WAIT = Histogram(
+    "validation_task_queue_wait_seconds",
+    "Time a Celery task spent in its queue before a worker started it",
+    ["task", "queue"],
+    buckets=LATENCY_BUCKETS,
+)
+TASK_RUN_TIME = Histogram(
+    "validation_task_run_seconds",
+    "Time a Celery task spent running on a worker",
+    ["task", "state"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_RATE_LIMIT_WAIT = Histogram(
+    "validation_openai_rate_limit_wait_seconds",
+    "Time an OpenAI call waited for capacity of the shared rate limiter",
+    ["throttled"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "validation_http_requests_total",
+    "Outgoing HTTP requests of the pooled sessions, reused connections included",
+    ["client"],
+)
+HTTP_CONNECTIONS_OPENED = Counter(
+    "validation_http_connections_opened_total",
+    "TCP connections opened by the pooled HTTP sessions",
+    ["client"],
+)
+HTTP_DNS_CACHE_HITS = Counter(
+    "validation_http_dns_cache_hits_total",
+    "Host lookups answered by the in-process DNS cache",
+)
+
+# endregion
+
+# Start times of running tasks, prerun and postrun fire in the same process
+_task_started = {}
+_task_started_lock = threading.Lock()
+
+
+@contextmanager
+def track_stage(stage):
+    """Time a pipeline stage and count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+
+
+def record_llm_usage(stage, response):
+    """Count the tokens and estimated cost reported by an LLM response."""
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return
+
+    model = getattr(response, "model", None) or "unknown"
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+    LLM_TOKENS.labels(stage, model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(stage, model, "completion").inc(completion_tokens)
+    LLM_COST.labels(stage, model).inc(
+        (
+            prompt_tokens * LLM_PROMPT_COST_PER_MILLION
+            + completion_tokens * LLM_COMPLETION_COST_PER_MILLION
+        )
+        / 1_000_000
+    )
+
+
+def stamp_published_message(headers):
+    """Record the enqueue time on an outgoing task message."""
+    headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+def record_task_started(task_id, task_name, queue, published_at):
+    """Observe the queue wait of a task that a worker has just started."""
+    if published_at:
+        # Clocks of the publishing and the consuming host may differ slightly
+        wait = max(time.time() - float(published_at), 0.0)
+        TASK_QUEUE_WAIT.labels(task_name, queue or "unknown").observe(wait)
+
+    with _task_started_lock:
+        _task_started[task_id] = time.perf_counter()
+
+
+def record_task_finished(task_id, task_name, state):
+    """Observe the run time of a task that a worker has just finished."""
+    with _task_started_lock:
+        started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_RUN_TIME.labels(task_name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+class QueueLengthCollector:
+    """Report the number of messages waiting in each Celery queue at scrape time."""
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "validation_queue_length",
+            "Messages waiting in a Celery queue",
+            labels=["queue"],
+        )
+        try:
+            client = get_redis_client()
+            for queue in CELERY_QUEUES:
+                gauge.add_metric([queue], client.llen(queue))
+        except RedisError as e:
+            logging.warning(f"Failed to read Celery queue lengths: {e}")
+        yield gauge
+
+
+def _build_registry():
+    """Return the registry to export, merging all processes in multiprocess mode."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+_app_registry = None
+_app_registry_lock = threading.Lock()
+
+
+def generate_app_metrics():
+    """Render the metrics of the web processes and the queue lengths."""
+    global _app_registry
+
+    with _app_registry_lock:
+        if _app_registry is None:
+            _app_registry = _build_registry()
+            _app_registry.register(QueueLengthCollector())
+    return generate_latest(_app_registry), CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter():
+    """Serve the metrics of a Celery worker and its pool processes over HTTP."""
+    try:
+        start_http_server(WORKER_METRICS_PORT, registry=_build_registry())
+    except OSError as e:
+        logging.warning(
+            f"Worker metrics exporter unavailable on port {WORKER_METRICS_PORT}: {e}"
+        )
+        return
+    logging.info(f"Serving worker metrics on port {WORKER_METRICS_PORT}")
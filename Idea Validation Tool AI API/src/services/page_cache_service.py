@@ -0,0 +1,224 @@
+import os
+import time
+import zlib
+import hashlib
+import logging
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client, enforce_lru_cap
+
+# region Load environment variables
+
+load_dotenv()
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_FRESH_SECONDS = int(os.getenv("PAGE_CACHE_FRESH_SECONDS", "21600"))
+PAGE_CACHE_MAX_AGE_SECONDS = int(os.getenv("PAGE_CACHE_MAX_AGE_SECONDS", "604800"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "5000"))
+PAGE_CACHE_LOCK_SECONDS = int(os.getenv("PAGE_CACHE_LOCK_SECONDS", "30"))
+PAGE_CACHE_LOCK_WAIT_SECONDS = float(os.getenv("PAGE_CACHE_LOCK_WAIT_SECONDS", "15"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+CACHE_KEY_PREFIX = "page:v1:"
+LOCK_KEY_PREFIX = "page:lock:"
+LRU_INDEX_KEY = "page:lru"
+STATS_KEY = "page:stats"
+
+TRACKING_QUERY_PREFIXES = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+
+
+def canonicalize_url(url):
+    """Normalize a URL so links that point to the same page share a cache key."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and not (
+        (parts.scheme == "http" and parts.port == 80)
+        or (parts.scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_QUERY_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
+
+
+def _url_hash(url):
+    return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+
+def _increment_stat(client, name):
+    client.hincrby(STATS_KEY, name, 1)
+
+
+def get_cached_page(url):
+    """Return the cached page for a URL, or None on a miss.
+
+    The result contains the cleaned text, the validators needed for a
+    conditional GET and whether the entry is still fresh.
+    """
+    if not PAGE_CACHE_ENABLED:
+        return None
+
+    key = CACHE_KEY_PREFIX + _url_hash(url)
+    try:
+        client = get_redis_client()
+        entry = client.hgetall(key)
+        if not entry:
+            _increment_stat(client, "misses")
+            return None
+
+        client.zadd(LRU_INDEX_KEY, {key: time.time()})
+        fetched_at = float(entry.get(b"fetched_at", 0))
+        fresh = time.time() - fetched_at < PAGE_CACHE_FRESH_SECONDS
+        _increment_stat(client, "hits" if fresh else "stale")
+    except RedisError as e:
+        logging.warning(f"Page cache lookup failed for {url}: {e}")
+        return None
+
+    return {
+        "text": zlib.decompress(entry[b"text"]).decode("utf-8"),
+        "etag": entry.get(b"etag", b"").decode("utf-8") or None,
+        "last_modified": entry.get(b"last_modified", b"").decode("utf-8") or None,
+        "fresh": fresh,
+    }
+
+
+def store_page(url, text, etag=None, last_modified=None):
+    """Store the cleaned page text compressed, together with its validators."""
+    if not PAGE_CACHE_ENABLED or not text:
+        return
+
+    key = CACHE_KEY_PREFIX + _url_hash(url)
+    try:
+        client = get_redis_client()
+        pipeline = client.pipeline()
+        pipeline.hset(
+            key,
+            mapping={
+                "url": canonicalize_url(url),
+                "text": zlib.compress(text.encode("utf-8")),
+                "etag": etag or "",
+                "last_modified": last_modified or "",
+                "fetched_at": time.time(),
+            },
+        )
+        pipeline.expire(key, PAGE_CACHE_MAX_AGE_SECONDS)
+        pipeline.zadd(LRU_INDEX_KEY, {key: time.time()})
+        pipeline.execute()
+
+        enforce_lru_cap(client, LRU_INDEX_KEY, PAGE_CACHE_MAX_ENTRIES)
+    except RedisError as e:
+        logging.warning(f"Page cache write failed for {url}: {e}")
+
+
+def mark_page_revalidated(url):
+    """Mark a cached page as fresh again after a 304 Not Modified response."""
+    if not PAGE_CACHE_ENABLED:
+        return
+
+    key = CACHE_KEY_PREFIX + _url_hash(url)
+    try:
+        client = get_redis_client()
+        pipeline = client.pipeline()
+        pipeline.hset(key, "fetched_at", time.time())
+        pipeline.expire(key, PAGE_CACHE_MAX_AGE_SECONDS)
+        pipeline.hincrby(STATS_KEY, "revalidated", 1)
+        pipeline.execute()
+    except RedisError as e:
+        logging.warning(f"Page cache revalidation failed for {url}: {e}")
+
+
+@contextmanager
+def single_flight(url, deadline=None):
+    """Make concurrent downloads of the same URL share one request.
+
+    The first caller acquires a short Redis lock and downloads the page. Other
+    callers block until the lock is released and are told so by the
+    waited_for_peer flag of the yielded dict, so they can re-read the cache
+    instead of downloading again. They never wait past the deadline (epoch
+    seconds) of their fetch. If the wait times out or Redis is unavailable,
+    callers simply download on their own.
+
+    A caller that hands the downloaded HTML on for parsing sets awaiting_parse,
+    the lock is then held until end_single_flight once the text is cached, or
+    until it expires.
+    """
+    if not PAGE_CACHE_ENABLED:
+        yield {"waited_for_peer": False, "awaiting_parse": False}
+        return
+
+    wait_seconds = PAGE_CACHE_LOCK_WAIT_SECONDS
+    if deadline is not None:
+        wait_seconds = max(min(wait_seconds, deadline - time.time()), 0)
+
+    lock = get_redis_client().lock(
+        LOCK_KEY_PREFIX + _url_hash(url),
+        timeout=PAGE_CACHE_LOCK_SECONDS,
+        blocking_timeout=wait_seconds,
+    )
+    waited_for_peer = False
+    acquired = False
+
+    try:
+        acquired = lock.acquire(blocking=False)
+        if not acquired:
+            waited_for_peer = True
+            acquired = lock.acquire()
+    except RedisError as e:
+        logging.warning(f"Page fetch lock unavailable for {url}: {e}")
+
+    flight = {"waited_for_peer": waited_for_peer, "awaiting_parse": False}
+    try:
+        yield flight
+    finally:
+        if acquired and not flight["awaiting_parse"]:
+            try:
+                lock.release()
+            except RedisError:
+                # The lock expired while downloading, nothing left to release
+                pass
+
+
+def end_single_flight(url):
+    """Let the callers waiting for a page that was handed on for parsing go ahead."""
+    if not PAGE_CACHE_ENABLED:
+        return
+
+    try:
+        get_redis_client().delete(LOCK_KEY_PREFIX + _url_hash(url))
+    except RedisError as e:
+        logging.warning(f"Failed to release the page fetch lock of {url}: {e}")
+
+
+def get_page_cache_stats():
+    """Return page cache counters and the number of cached pages."""
+    client = get_redis_client()
+    stats = client.hgetall(STATS_KEY)
+    counters = {
+        name: int(stats.get(name.encode("utf-8"), 0))
+        for name in ("hits", "stale", "misses", "revalidated")
+    }
+    lookups = sum(counters[name] for name in ("hits", "stale", "misses"))
+
+    return {
+        "enabled": PAGE_CACHE_ENABLED,
+        "entries": client.zcard(LRU_INDEX_KEY),
+        "max_entries": PAGE_CACHE_MAX_ENTRIES,
+        **counters,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,112 @@
+import os
+import math
+import logging
+from collections import Counter
+from dotenv import load_dotenv
+from src.services.search_cache_service import normalize_search_term
+
+# region Load environment variables
+
+load_dotenv()
+
+RANKING_ENABLED = os.getenv("RANKING_ENABLED", "true").lower() == "true"
+FETCH_TOP_K = int(os.getenv("FETCH_TOP_K", "5"))
+# Hits scoring below this share of the best hit's score are not fetched
+RANKING_MIN_SCORE_RATIO = float(os.getenv("RANKING_MIN_SCORE_RATIO", "0.2"))
+# Fewer surviving pages than this trigger a second round from the reserve
+MIN_FETCHED_PAGES = int(os.getenv("MIN_FETCHED_PAGES", "3"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+# Standard BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words too common in ideas and snippets to say anything about relevance
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have how in into is it its of on or "
+    "that the their this to was what when which who will with you your".split()
+)
+
+
+def _tokenize(text):
+    return [
+        word
+        for word in normalize_search_term(text).split()
+        if word not in STOP_WORDS and len(word) > 1
+    ]
+
+
+def score_search_items(search_items, user_query, problem_statement=""):
+    """Score each item's title and snippet against the idea with BM25.
+
+    Query terms count once each, so a term repeated in the problem statement
+    does not outweigh the rest of the query.
+    """
+    documents = [
+        _tokenize(f"{item.get('title', '')} {item.get('snippet', '')}")
+        for item in search_items
+    ]
+    query_terms = set(_tokenize(f"{user_query} {problem_statement}"))
+    if not documents or not query_terms:
+        return [0.0] * len(search_items)
+
+    average_length = sum(len(document) for document in documents) / len(documents)
+    average_length = average_length or 1
+    document_frequency = Counter(
+        term for document in documents for term in set(document)
+    )
+
+    scores = []
+    for document in documents:
+        term_counts = Counter(document)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(document) / average_length)
+        score = 0.0
+        for term in query_terms:
+            count = term_counts.get(term)
+            if not count:
+                continue
+            idf = math.log(
+                1
+                + (len(documents) - document_frequency[term] + 0.5)
+                / (document_frequency[term] + 0.5)
+            )
+            score += idf * count * (BM25_K1 + 1) / (count + length_norm)
+        scores.append(score)
+    return scores
+
+
+def select_search_items(search_items, user_query, problem_statement=""):
+    """Split search items into the top-k to fetch and a ranked reserve.
+
+    Items scoring far below the best item are never fetched up front, they
+    only fill the reserve. With ranking disabled, or when no item matches the
+    query, Google's order is kept.
+    """
+    if not RANKING_ENABLED:
+        return search_items[:FETCH_TOP_K], search_items[FETCH_TOP_K:]
+
+    scores = score_search_items(search_items, user_query, problem_statement)
+    best_score = max(scores, default=0.0)
+    if best_score <= 0:
+        return search_items[:FETCH_TOP_K], search_items[FETCH_TOP_K:]
+
+    # Stable sort, so equally scored items keep Google's order
+    ranked = sorted(zip(scores, search_items), key=lambda pair: -pair[0])
+    min_score = best_score * RANKING_MIN_SCORE_RATIO
+    selected = [item for score, item in ranked[:FETCH_TOP_K] if score >= min_score]
+    reserve = [item for _, item in ranked[len(selected) :]]
+
+    logging.info(
+        f"Ranked {len(search_items)} hits, fetching {len(selected)}: "
+        f"{[round(score, 2) for score, _ in ranked]}"
+    )
+    return selected, reserve
@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+import threading
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client
+from src.services.metrics_service import OPENAI_RATE_LIMIT_WAIT
+
+# region Load environment variables
+
+load_dotenv()
+
+OPENAI_LIMITER_ENABLED = os.getenv("OPENAI_LIMITER_ENABLED", "true").lower() == "true"
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+OPENAI_LIMITER_MAX_WAIT_SECONDS = float(
+    os.getenv("OPENAI_LIMITER_MAX_WAIT_SECONDS", "120")
+)
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+REQUESTS_BUCKET_KEY = "openai:limiter:requests"
+TOKENS_BUCKET_KEY = "openai:limiter:tokens"
+STATS_KEY = "openai:limiter:stats"
+
+# Upper bound of a single sleep so waiters re-check capacity regularly
+MAX_SLEEP_SECONDS = 2.0
+
+# Both buckets refill continuously at capacity per minute. The script either
+# takes one request and the estimated tokens from both buckets, or takes
+# nothing and returns how many milliseconds to wait. Redis TIME is used so all
+# workers share one clock.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local function refill(key, capacity)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, tokens + (now - ts) * capacity / 60000)
+end
+
+local request_capacity = tonumber(ARGV[1])
+local token_capacity = tonumber(ARGV[2])
+-- A call larger than the bucket only waits for a full bucket
+local cost = math.min(tonumber(ARGV[3]), token_capacity)
+
+local requests = refill(KEYS[1], request_capacity)
+local tokens = refill(KEYS[2], token_capacity)
+
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60000 / request_capacity)
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60000 / token_capacity)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+
+redis.call('HSET', KEYS[1], 'tokens', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+# Gives back over-estimated tokens, or takes the shortfall, once the real
+# usage of a call is known
+SETTLE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * capacity / 60000 + tonumber(ARGV[2]))
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 0
+"""
+
+_scripts = {}
+_scripts_lock = threading.Lock()
+
+
+def _get_script(name, source):
+    with _scripts_lock:
+        if name not in _scripts:
+            _scripts[name] = get_redis_client().register_script(source)
+        return _scripts[name]
+
+
+def acquire_openai_capacity(estimated_tokens):
+    """Block until the cluster-wide OpenAI budget has room for one call.
+
+    Calls queue for capacity instead of failing. Returns the seconds spent
+    waiting. If Redis is unavailable, or the wait exceeds the configured
+    maximum, the call proceeds and the provider's own limits apply.
+    """
+    if not OPENAI_LIMITER_ENABLED:
+        return 0.0
+
+    started = time.monotonic()
+    throttled = False
+    try:
+        acquire = _get_script("acquire", ACQUIRE_SCRIPT)
+        while True:
+            wait_ms = acquire(
+                keys=[REQUESTS_BUCKET_KEY, TOKENS_BUCKET_KEY],
+                args=[OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, int(estimated_tokens)],
+            )
+            if not wait_ms:
+                break
+
+            waited = time.monotonic() - started
+            if waited >= OPENAI_LIMITER_MAX_WAIT_SECONDS:
+                logging.warning(
+                    f"OpenAI limiter wait exceeded {OPENAI_LIMITER_MAX_WAIT_SECONDS}s, proceeding"
+                )
+                break
+            throttled = True
+            time.sleep(min(wait_ms / 1000, MAX_SLEEP_SECONDS))
+    except RedisError as e:
+        logging.warning(f"OpenAI limiter unavailable, proceeding unthrottled: {e}")
+        waited = time.monotonic() - started
+        OPENAI_RATE_LIMIT_WAIT.labels(str(throttled).lower()).observe(waited)
+        return waited
+
+    waited = time.monotonic() - started
+    OPENAI_RATE_LIMIT_WAIT.labels(str(throttled).lower()).observe(waited)
+    _record_wait(waited, throttled)
+    return waited
+
+
+def settle_openai_tokens(estimated_tokens, actual_tokens):
+    """Correct the token bucket once the actual usage of a call is known."""
+    if not OPENAI_LIMITER_ENABLED or actual_tokens is None:
+        return
+
+    try:
+        _get_script("settle", SETTLE_SCRIPT)(
+            keys=[TOKENS_BUCKET_KEY],
+            args=[OPENAI_TPM_LIMIT, int(estimated_tokens) - int(actual_tokens)],
+        )
+    except RedisError as e:
+        logging.warning(f"OpenAI limiter settle failed: {e}")
+
+
+def _record_wait(waited, throttled):
+    try:
+        pipeline = get_redis_client().pipeline()
+        pipeline.hincrby(STATS_KEY, "acquisitions", 1)
+        if throttled:
+            pipeline.hincrby(STATS_KEY, "throttled", 1)
+            pipeline.hincrbyfloat(STATS_KEY, "wait_seconds_total", waited)
+        pipeline.execute()
+    except RedisError as e:
+        logging.warning(f"OpenAI limiter stats update failed: {e}")
+
+
+def get_rate_limiter_stats():
+    """Return the configured limits and the cluster-wide wait statistics."""
+    stats = get_redis_client().hgetall(STATS_KEY)
+    acquisitions = int(stats.get(b"acquisitions", 0))
+    wait_seconds_total = float(stats.get(b"wait_seconds_total", 0))
+
+    return {
+        "enabled": OPENAI_LIMITER_ENABLED,
+        "requests_per_minute": OPENAI_RPM_LIMIT,
+        "tokens_per_minute": OPENAI_TPM_LIMIT,
+        "acquisitions": acquisitions,
+        "throttled": int(stats.get(b"throttled", 0)),
+        "wait_seconds_total": round(wait_seconds_total, 3),
+        "average_wait_seconds": (
+            round(wait_seconds_total / acquisitions, 4) if acquisitions else 0.0
+        ),
+    }
@@ -0,0 +1,44 @@
+import os
+import redis
+from dotenv import load_dotenv
+
+# region Load environment variables
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# endregion
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Return the shared Redis client used for caching and coordination.
+
+    redis-py connection pools detect forks on their own, so the client can be
+    created once per process and reused by every thread.
+    """
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=5, socket_connect_timeout=5
+        )
+    return _redis_client
+
+
+def enforce_lru_cap(client, index_key, max_entries):
+    """Evict the least recently used entries tracked in a sorted-set index.
+
+    Members of the index are cache keys scored by their last access time.
+    Returns the number of evicted entries.
+    """
+    overflow = client.zcard(index_key) - max_entries
+    if overflow <= 0:
+        return 0
+
+    evicted = client.zpopmin(index_key, overflow)
+    if evicted:
+        client.delete(*[member for member, _ in evicted])
+    return len(evicted)
@@ -0,0 +1,105 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from src.models import get_db_session, SearchTask, RelevantPost
+from src.services.checkpoint_service import add_relevant_posts
+from src.services.email_outbox_service import (
+    add_to_outbox,
+    render_results_email,
+    RESULTS_EMAIL_SUBJECT,
+)
+
+# region Load environment variables
+
+load_dotenv()
+
+RESULT_REPLAY_ENABLED = os.getenv("RESULT_REPLAY_ENABLED", "true").lower() == "true"
+RESULT_REPLAY_MAX_AGE_HOURS = float(os.getenv("RESULT_REPLAY_MAX_AGE_HOURS", "24"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+
+def find_replayable_task(session, fingerprint):
+    """Return the newest fresh SUCCESS task with the same fingerprint, or None.
+
+    Replays are never used as a source so results age out of the window even
+    when the same idea keeps being resubmitted.
+    """
+    if not RESULT_REPLAY_ENABLED:
+        return None
+
+    fresh_after = datetime.utcnow() - timedelta(hours=RESULT_REPLAY_MAX_AGE_HOURS)
+    return (
+        session.query(SearchTask)
+        .filter(
+            SearchTask.fingerprint == fingerprint,
+            SearchTask.status == "SUCCESS",
+            SearchTask.completed_at >= fresh_after,
+            SearchTask.replayed_from.is_(None),
+        )
+        .order_by(SearchTask.completed_at.desc())
+        .first()
+    )
+
+
+def create_replay_task(
+    fingerprint, task_id, user_email, user_query, problem_statement, target_audience
+):
+    """Record a replay of stored results for a new request.
+
+    Copies the analysis and relevant posts of the matching task to a new
+    search_tasks row and queues the results email in the same transaction.
+    Returns the replayed summary, or None without a match.
+    """
+    session = get_db_session()
+    try:
+        source_task = find_replayable_task(session, fingerprint)
+        if not source_task:
+            return None
+
+        relevant_posts = [
+            {"title": post.title, "link": post.link}
+            for post in session.query(RelevantPost).filter(
+                RelevantPost.task_id == source_task.task_id
+            )
+        ]
+
+        session.add(
+            SearchTask(
+                task_id=task_id,
+                email=user_email,
+                query=user_query,
+                problem_statement=problem_statement,
+                target_audience=target_audience,
+                analysis=source_task.analysis,
+                status="SENDING_EMAIL",
+                synthesized_at=datetime.utcnow(),
+                prompt_tokens=0,
+                completion_tokens=0,
+                fingerprint=fingerprint,
+                replayed_from=source_task.task_id,
+            )
+        )
+        add_relevant_posts(session, task_id, relevant_posts)
+        add_to_outbox(
+            session,
+            task_id,
+            [user_email],
+            RESULTS_EMAIL_SUBJECT,
+            render_results_email(user_query, source_task.analysis, relevant_posts),
+        )
+        session.commit()
+
+        logging.info(f"Replaying results of task {source_task.task_id} as {task_id}")
+        return {"analysis": source_task.analysis, "relevant_posts": relevant_posts}
+    finally:
+        session.close()
@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client
+
+# region Load environment variables
+
+load_dotenv()
+
+GOOGLE_SEARCH_CACHE_ENABLED = (
+    os.getenv("GOOGLE_SEARCH_CACHE_ENABLED", "true").lower() == "true"
+)
+GOOGLE_SEARCH_CACHE_TTL_SECONDS = int(
+    os.getenv("GOOGLE_SEARCH_CACHE_TTL_SECONDS", "86400")
+)
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+CACHE_KEY_PREFIX = "cse:v1:"
+STATS_KEY = "cse:stats"
+
+# Only the fields used downstream are cached to keep entries small
+CACHED_ITEM_FIELDS = ("link", "title", "snippet")
+
+
+def normalize_search_term(term):
+    """Normalize a search term so trivially different spellings share a key."""
+    term = unicodedata.normalize("NFKC", term or "").lower()
+    term = re.sub(r"[^\w\s]", " ", term)
+    return " ".join(term.split())
+
+
+def build_cache_key(term, search_depth, site_filter=None):
+    """Build the Redis key for a search term, depth and site filter."""
+    raw_key = "|".join(
+        [
+            normalize_search_term(term),
+            str(search_depth),
+            (site_filter or "").strip().lower(),
+        ]
+    )
+    return CACHE_KEY_PREFIX + hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def get_cached_search(term, search_depth, site_filter=None):
+    """Return cached search items, or None on a miss or cache failure."""
+    if not GOOGLE_SEARCH_CACHE_ENABLED:
+        return None
+
+    try:
+        client = get_redis_client()
+        cached = client.get(build_cache_key(term, search_depth, site_filter))
+        client.hincrby(STATS_KEY, "hits" if cached is not None else "misses", 1)
+    except RedisError as e:
+        logging.warning(f"Search cache lookup failed: {e}")
+        return None
+
+    return json.loads(cached) if cached is not None else None
+
+
+def cache_search(term, search_depth, site_filter, items):
+    """Store search items for the configured TTL. Failures are only logged."""
+    if not GOOGLE_SEARCH_CACHE_ENABLED or not items:
+        return
+
+    compact_items = [
+        {field: item.get(field, "") for field in CACHED_ITEM_FIELDS} for item in items
+    ]
+    try:
+        get_redis_client().setex(
+            build_cache_key(term, search_depth, site_filter),
+            GOOGLE_SEARCH_CACHE_TTL_SECONDS,
+            json.dumps(compact_items, separators=(",", ":")),
+        )
+    except RedisError as e:
+        logging.warning(f"Search cache write failed: {e}")
+
+
+def get_search_cache_stats():
+    """Return hit/miss counters and the number of cached search terms."""
+    client = get_redis_client()
+    stats = client.hgetall(STATS_KEY)
+    hits = int(stats.get(b"hits", 0))
+    misses = int(stats.get(b"misses", 0))
+    lookups = hits + misses
+
+    return {
+        "enabled": GOOGLE_SEARCH_CACHE_ENABLED,
+        "ttl_seconds": GOOGLE_SEARCH_CACHE_TTL_SECONDS,
+        "entries": sum(1 for _ in client.scan_iter(match=CACHE_KEY_PREFIX + "*")),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def purge_search_cache():
+    """Delete every cached search result and reset the counters."""
+    client = get_redis_client()
+    deleted = 0
+    batch = []
+
+    for key in client.scan_iter(match=CACHE_KEY_PREFIX + "*", count=500):
+        batch.append(key)
+        if len(batch) >= 500:
+            deleted += client.delete(*batch)
+            batch = []
+    if batch:
+        deleted += client.delete(*batch)
+
+    client.delete(STATS_KEY)
+    logging.info(f"Purged {deleted} cached search result(s)")
+    return deleted
@@ -0,0 +1,452 @@
+import os
+import json
+import fcntl
+import socket
+import logging
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from openai import OpenAI
+from src.models import get_db_session, SearchTask
+from src.services.metrics_service import track_stage
+from src.services.rate_limiter_service import (
+    acquire_openai_capacity,
+    settle_openai_tokens,
+)
+from src.services.token_budget_service import count_tokens
+
+# region Load environment variables
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "data/semantic_cache")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TOP_K = int(os.getenv("SEMANTIC_CACHE_TOP_K", "5"))
+SEMANTIC_CACHE_MAX_AGE_DAYS = float(os.getenv("SEMANTIC_CACHE_MAX_AGE_DAYS", "30"))
+# Segments are merged into the base once they hold this many ideas
+SEMANTIC_CACHE_COMPACT_ENTRIES = int(
+    os.getenv("SEMANTIC_CACHE_COMPACT_ENTRIES", "1000")
+)
+
+# endregion
+
+# region Clients setup
+
+open_ai_client = OpenAI(api_key=OPENAI_API_KEY)
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+LOCK_FILE = "index.lock"
+
+# The index is a compacted base file plus one append-only segment file per
+# worker process. Both hold fixed-size records of a task ID and its vector,
+# their names carry the vector dimensions: base-1536.bin,
+# segment-1536-<host>-<pid>.bin.
+BASE_PREFIX = "base"
+SEGMENT_PREFIX = "segment"
+INDEX_FILE_SUFFIX = ".bin"
+TASK_ID_BYTES = 64
+
+# Segments are also merged once there are this many, one per indexing process
+MAX_SEGMENT_FILES = 32
+
+# Records copied per write while compacting, bounds the memory of a merge
+COMPACT_CHUNK_RECORDS = 10000
+
+# region Per-process index state
+
+# Index files are memory-mapped read-only and shared by every thread. A file
+# is remapped only when its size or mtime has changed, so an append does not
+# reload the base.
+_index_files = {}
+_index_lock = threading.Lock()
+
+# endregion
+
+
+def _index_path(file_name):
+    return os.path.join(SEMANTIC_CACHE_DIR, file_name)
+
+
+def build_idea_text(user_query, problem_statement, target_audience):
+    """Combine the fields that describe an idea into one text to embed."""
+    return (
+        f"Query: {user_query}\n"
+        f"Problem Statement: {problem_statement}\n"
+        f"Target Audience: {target_audience}"
+    )
+
+
+def embed_idea(user_query, problem_statement, target_audience):
+    """Return the L2-normalized float32 embedding of an idea, or None.
+
+    Nothing is requested while the semantic cache is disabled. The call waits
+    for capacity of the shared OpenAI rate limiter.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+
+    idea_text = build_idea_text(user_query, problem_statement, target_audience)
+    estimated_tokens = count_tokens(idea_text)
+    waited = acquire_openai_capacity(estimated_tokens)
+    if waited > 1:
+        logging.info(f"Waited {waited:.1f}s for OpenAI capacity (embedding)")
+
+    try:
+        with track_stage("embedding"):
+            response = open_ai_client.embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL, input=idea_text
+            )
+    except Exception as e:
+        logging.error(f"Error embedding idea: {e}")
+        return None
+
+    if getattr(response, "usage", None):
+        settle_openai_tokens(estimated_tokens, response.usage.total_tokens)
+
+    embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else None
+
+
+@contextmanager
+def _exclusive_index_lock():
+    """Serialize index writers across processes and containers."""
+    os.makedirs(SEMANTIC_CACHE_DIR, exist_ok=True)
+    with open(_index_path(LOCK_FILE), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _record_dtype(dimensions):
+    return np.dtype(
+        [("task_id", f"S{TASK_ID_BYTES}"), ("vector", "<f4", (dimensions,))]
+    )
+
+
+def _file_dimensions(file_name):
+    """Return the vector dimensions encoded in an index file name, or None."""
+    if not file_name.endswith(INDEX_FILE_SUFFIX):
+        return None
+    parts = file_name[: -len(INDEX_FILE_SUFFIX)].split("-", 2)
+    if parts[0] not in (BASE_PREFIX, SEGMENT_PREFIX) or len(parts) < 2:
+        return None
+    return int(parts[1]) if parts[1].isdigit() else None
+
+
+def _segment_file_name(dimensions):
+    """Name of the segment this process appends to, unique across containers."""
+    return (
+        f"{SEGMENT_PREFIX}-{dimensions}-{socket.gethostname()}-{os.getpid()}"
+        f"{INDEX_FILE_SUFFIX}"
+    )
+
+
+def _map_index_file(path, dimensions):
+    """Memory-map the complete records of an index file.
+
+    A record torn by an interrupted append is ignored.
+    """
+    dtype = _record_dtype(dimensions)
+    count = os.path.getsize(path) // dtype.itemsize
+    if not count:
+        return None, []
+
+    records = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+    return records, [task_id.decode("utf-8") for task_id in records["task_id"]]
+
+
+def load_index():
+    """Memory-map the on-disk index files, remapping only those that changed.
+
+    Returns {file name: (dimensions, records, task_ids)}.
+    """
+    try:
+        entries = list(os.scandir(SEMANTIC_CACHE_DIR))
+    except FileNotFoundError:
+        return {}
+
+    with _index_lock:
+        index_files = {}
+        changed = False
+        for entry in entries:
+            dimensions = _file_dimensions(entry.name)
+            if dimensions is None:
+                continue
+
+            try:
+                stat = entry.stat()
+                version = (stat.st_size, stat.st_mtime_ns)
+                cached = _index_files.get(entry.name)
+                if cached and cached[0] == version:
+                    index_files[entry.name] = cached
+                    continue
+                records, task_ids = _map_index_file(entry.path, dimensions)
+            except FileNotFoundError:
+                # Merged into the base by a concurrent compaction
+                continue
+
+            changed = True
+            if records is not None:
+                index_files[entry.name] = (version, dimensions, records, task_ids)
+
+        changed = changed or index_files.keys() != _index_files.keys()
+        _index_files.clear()
+        _index_files.update(index_files)
+
+    if changed:
+        entries_count = sum(len(task_ids) for *_, task_ids in index_files.values())
+        logging.info(
+            f"Loaded semantic index with {entries_count} ideas "
+            f"in {len(index_files)} file(s)"
+        )
+    return {
+        name: (dimensions, records, task_ids)
+        for name, (_, dimensions, records, task_ids) in index_files.items()
+    }
+
+
+def _atomic_write(path, write):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        write(f)
+    os.replace(temp_path, path)
+
+
+def add_to_index(task_id, embedding):
+    """Append the embedding of a completed task to the on-disk index.
+
+    Accepts an array or the raw float32 bytes stored on the task row.
+    """
+    if not SEMANTIC_CACHE_ENABLED or embedding is None:
+        return
+
+    if isinstance(embedding, bytes):
+        embedding = np.frombuffer(embedding, dtype=np.float32)
+    embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+    try:
+        with _exclusive_index_lock():
+            _append_to_index(task_id, embedding)
+            _compact_if_needed(embedding.shape[0])
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to add task {task_id} to the semantic index: {e}")
+
+
+def _append_to_index(task_id, embedding):
+    """Append one record to the segment of this process, O(d) per task."""
+    if len(task_id.encode("utf-8")) > TASK_ID_BYTES:
+        raise ValueError(f"task ID longer than {TASK_ID_BYTES} bytes")
+
+    record = np.zeros(1, dtype=_record_dtype(embedding.shape[0]))
+    record["task_id"] = task_id.encode("utf-8")
+    record["vector"] = embedding
+
+    with open(_index_path(_segment_file_name(embedding.shape[0])), "ab") as f:
+        # Drop a record torn by an earlier failed append of this process
+        size = os.fstat(f.fileno()).st_size
+        if size % record.itemsize:
+            f.truncate(size - size % record.itemsize)
+        f.write(record.tobytes())
+
+
+def _compact_if_needed(dimensions):
+    index_files = load_index()
+    segments = [
+        (name, task_ids)
+        for name, (_, _, task_ids) in index_files.items()
+        if name.startswith(SEGMENT_PREFIX)
+    ]
+    segment_entries = sum(len(task_ids) for _, task_ids in segments)
+    if (
+        segment_entries >= SEMANTIC_CACHE_COMPACT_ENTRIES
+        or len(segments) >= MAX_SEGMENT_FILES
+    ):
+        _compact_index(dimensions, index_files)
+
+
+def _compact_index(dimensions, index_files):
+    """Merge the base and the segments into a new base, once per task ID.
+
+    Files of other dimensions belong to an earlier embedding model and are
+    dropped. Runs under the exclusive index lock, readers keep their mapping
+    of the replaced files.
+    """
+    seen = set()
+
+    def write_records(f):
+        # The base sorts before the segments, so its records come first
+        for name in sorted(index_files):
+            file_dimensions, records, task_ids = index_files[name]
+            if file_dimensions != dimensions:
+                continue
+            for start in range(0, len(task_ids), COMPACT_CHUNK_RECORDS):
+                keep = []
+                for offset, task_id in enumerate(
+                    task_ids[start : start + COMPACT_CHUNK_RECORDS]
+                ):
+                    if task_id not in seen:
+                        seen.add(task_id)
+                        keep.append(start + offset)
+                f.write(records[keep].tobytes())
+
+    base_name = f"{BASE_PREFIX}-{dimensions}{INDEX_FILE_SUFFIX}"
+    _atomic_write(_index_path(base_name), write_records)
+    _remove_index_files(name for name in index_files if name != base_name)
+    logging.info(f"Compacted the semantic index into {len(seen)} ideas")
+
+
+def _remove_index_files(file_names):
+    for file_name in file_names:
+        try:
+            os.remove(_index_path(file_name))
+        except FileNotFoundError:
+            pass
+
+
+def find_similar_ideas(embedding, top_k=SEMANTIC_CACHE_TOP_K):
+    """Return up to top_k (task_id, similarity) pairs above the threshold."""
+    try:
+        index_files = load_index()
+    except (OSError, ValueError) as e:
+        logging.warning(f"Semantic index unavailable: {e}")
+        return []
+
+    files = [
+        (records, task_ids)
+        for dimensions, records, task_ids in index_files.values()
+        if dimensions == embedding.shape[0]
+    ]
+    if not files:
+        return []
+
+    # Vectors are normalized, so the dot product is the cosine similarity
+    similarities = np.concatenate(
+        [records["vector"] @ embedding for records, _ in files]
+    )
+    task_ids = [task_id for _, file_task_ids in files for task_id in file_task_ids]
+
+    # A task may be in the base and a segment until the next compaction
+    candidate_count = min(top_k * 2, len(similarities))
+    candidates = np.argpartition(-similarities, candidate_count - 1)[:candidate_count]
+    candidates = candidates[np.argsort(-similarities[candidates])]
+
+    matches = {}
+    for i in candidates:
+        if similarities[i] >= SEMANTIC_CACHE_THRESHOLD:
+            matches.setdefault(task_ids[i], float(similarities[i]))
+    return list(matches.items())[:top_k]
+
+
+def find_reusable_results(embedding):
+    """Return the stored search results of the most similar fresh idea.
+
+    Returns (task_id, similarity, results), or None when no completed task
+    within the age limit is similar enough.
+    """
+    if not SEMANTIC_CACHE_ENABLED or embedding is None:
+        return None
+
+    matches = find_similar_ideas(embedding)
+    if not matches:
+        return None
+
+    fresh_after = datetime.utcnow() - timedelta(days=SEMANTIC_CACHE_MAX_AGE_DAYS)
+    session = get_db_session()
+    try:
+        for task_id, similarity in matches:
+            source_task = (
+                session.query(SearchTask)
+                .filter(
+                    SearchTask.task_id == task_id,
+                    SearchTask.status == "SUCCESS",
+                    SearchTask.completed_at >= fresh_after,
+                    SearchTask.search_results.isnot(None),
+                )
+                .first()
+            )
+            if source_task:
+                return task_id, similarity, json.loads(source_task.search_results)
+    finally:
+        session.close()
+
+    return None
+
+
+def rebuild_index():
+    """Rebuild the on-disk index from the embeddings stored on completed tasks."""
+    session = get_db_session()
+    try:
+        rows = (
+            session.query(SearchTask.task_id, SearchTask.idea_embedding)
+            .filter(
+                SearchTask.status == "SUCCESS",
+                SearchTask.idea_embedding.isnot(None),
+                SearchTask.search_results.isnot(None),
+            )
+            .order_by(SearchTask.id)
+            .all()
+        )
+    finally:
+        session.close()
+
+    if not rows:
+        return 0
+
+    # Only embeddings of the current model size can share one index
+    dimensions = len(rows[-1][1]) // np.dtype(np.float32).itemsize
+    records = np.zeros(len(rows), dtype=_record_dtype(dimensions))
+    count = 0
+    for task_id, embedding in rows:
+        embedding = np.frombuffer(embedding, dtype=np.float32)
+        if embedding.shape[0] == dimensions:
+            records[count] = (task_id.encode("utf-8"), embedding)
+            count += 1
+
+    base_name = f"{BASE_PREFIX}-{dimensions}{INDEX_FILE_SUFFIX}"
+    with _exclusive_index_lock():
+        _atomic_write(
+            _index_path(base_name), lambda f: f.write(records[:count].tobytes())
+        )
+        _remove_index_files(name for name in load_index() if name != base_name)
+    return count
+
+
+def get_semantic_cache_stats():
+    """Return the index configuration and the number of indexed ideas."""
+    index_files = load_index()
+    entries_by_dimensions = {}
+    for dimensions, _, task_ids in index_files.values():
+        entries_by_dimensions[dimensions] = entries_by_dimensions.get(
+            dimensions, 0
+        ) + len(task_ids)
+
+    return {
+        "enabled": SEMANTIC_CACHE_ENABLED,
+        "threshold": SEMANTIC_CACHE_THRESHOLD,
+        "top_k": SEMANTIC_CACHE_TOP_K,
+        "entries": sum(entries_by_dimensions.values()),
+        "files": len(index_files),
+        "dimensions": (
+            max(entries_by_dimensions, key=entries_by_dimensions.get)
+            if entries_by_dimensions
+            else None
+        ),
+    }
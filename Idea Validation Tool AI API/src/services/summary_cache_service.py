@@ -0,0 +1,105 @@
+import os
+import time
+import hashlib
+import logging
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from src.services.redis_service import get_redis_client, enforce_lru_cap
+from src.services.search_cache_service import normalize_search_term
+
+# region Load environment variables
+
+load_dotenv()
+
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "604800"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "20000"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+CACHE_KEY_PREFIX = "summary:v1:"
+LRU_INDEX_KEY = "summary:lru"
+STATS_KEY = "summary:stats"
+
+
+def build_summary_key(content, search_query, character_limit, model):
+    """Build the cache key from the page content, query, limit and model."""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    raw_key = "|".join(
+        [
+            content_hash,
+            normalize_search_term(search_query),
+            str(character_limit),
+            model or "",
+        ]
+    )
+    return CACHE_KEY_PREFIX + hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def get_cached_summary(content, search_query, character_limit, model):
+    """Return a memoized summary, or None on a miss or cache failure."""
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+
+    key = build_summary_key(content, search_query, character_limit, model)
+    try:
+        client = get_redis_client()
+        summary = client.get(key)
+        if summary is None:
+            client.hincrby(STATS_KEY, "misses", 1)
+            return None
+
+        pipeline = client.pipeline()
+        pipeline.hincrby(STATS_KEY, "hits", 1)
+        pipeline.zadd(LRU_INDEX_KEY, {key: time.time()})
+        pipeline.execute()
+    except RedisError as e:
+        logging.warning(f"Summary cache lookup failed: {e}")
+        return None
+
+    return summary.decode("utf-8")
+
+
+def cache_summary(content, search_query, character_limit, model, summary):
+    """Memoize a summary with TTL and LRU eviction. Failures are only logged."""
+    if not SUMMARY_CACHE_ENABLED or not summary:
+        return
+
+    key = build_summary_key(content, search_query, character_limit, model)
+    try:
+        client = get_redis_client()
+        pipeline = client.pipeline()
+        pipeline.setex(key, SUMMARY_CACHE_TTL_SECONDS, summary)
+        pipeline.zadd(LRU_INDEX_KEY, {key: time.time()})
+        pipeline.execute()
+
+        enforce_lru_cap(client, LRU_INDEX_KEY, SUMMARY_CACHE_MAX_ENTRIES)
+    except RedisError as e:
+        logging.warning(f"Summary cache write failed: {e}")
+
+
+def get_summary_cache_stats():
+    """Return summary cache hit/miss counters and the number of entries."""
+    client = get_redis_client()
+    stats = client.hgetall(STATS_KEY)
+    hits = int(stats.get(b"hits", 0))
+    misses = int(stats.get(b"misses", 0))
+    lookups = hits + misses
+
+    return {
+        "enabled": SUMMARY_CACHE_ENABLED,
+        "ttl_seconds": SUMMARY_CACHE_TTL_SECONDS,
+        "entries": client.zcard(LRU_INDEX_KEY),
+        "max_entries": SUMMARY_CACHE_MAX_ENTRIES,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import logging
+import threading
+from dotenv import load_dotenv
+
+# The tokenizer is optional, a character based estimate is used without it
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# region Load environment variables
+
+load_dotenv()
+
+OPENAI_AI_MINI_MODEL = os.getenv("OPENAI_AI_MINI_MODEL")
+
+SUMMARY_INPUT_TOKEN_BUDGET = int(os.getenv("SUMMARY_INPUT_TOKEN_BUDGET", "4000"))
+SUMMARY_OUTPUT_TOKEN_BUDGET = int(os.getenv("SUMMARY_OUTPUT_TOKEN_BUDGET", "400"))
+RAG_INPUT_TOKEN_BUDGET = int(os.getenv("RAG_INPUT_TOKEN_BUDGET", "6000"))
+RAG_OUTPUT_TOKEN_BUDGET = int(os.getenv("RAG_OUTPUT_TOKEN_BUDGET", "1500"))
+
+# endregion
+
+# region Logging configuration
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# endregion
+
+# Rough average for English prose with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+# Share of a trimmed text kept from the beginning, the rest comes from the end
+HEAD_RATIO = 0.7
+
+TRIM_MARKER = " [...] "
+
+# Expected output size of calls that do not set max_completion_tokens
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 100
+
+SENTENCE_END_PATTERN = re.compile(r"[.!?]\s")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tokenizer once, or return None to use the estimator."""
+    global _encoding, _encoding_loaded
+
+    if _encoding_loaded:
+        return _encoding
+
+    with _encoding_lock:
+        if not _encoding_loaded:
+            if tiktoken is not None:
+                try:
+                    encoding_name = tiktoken.encoding_name_for_model(
+                        OPENAI_AI_MINI_MODEL or ""
+                    )
+                except KeyError:
+                    encoding_name = "o200k_base"
+
+                try:
+                    _encoding = tiktoken.get_encoding(encoding_name)
+                except Exception as e:
+                    # The BPE files are downloaded on first use and may be unreachable
+                    logging.warning(f"Tokenizer unavailable, estimating tokens: {e}")
+            _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    """Count the tokens of a text, estimating when no tokenizer is available."""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _slice_head(text, token_budget):
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: token_budget * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:token_budget])
+
+
+def _slice_tail(text, token_budget):
+    if token_budget <= 0:
+        return ""
+
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[-token_budget * CHARS_PER_TOKEN :]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[-token_budget:])
+
+
+def trim_to_token_budget(text, token_budget):
+    """Trim a text to a token budget keeping its beginning and its end.
+
+    The head usually carries the title and lead paragraph while the tail holds
+    conclusions, so the middle is dropped. Cuts are moved to sentence
+    boundaries when one is close enough.
+    """
+    if not text or count_tokens(text) <= token_budget:
+        return text
+
+    head_budget = int(token_budget * HEAD_RATIO)
+    head = _slice_head(text, head_budget)
+    tail = _slice_tail(text, token_budget - head_budget - count_tokens(TRIM_MARKER))
+
+    # End the head after its last full sentence if that loses little text
+    sentence_ends = [match.end() for match in SENTENCE_END_PATTERN.finditer(head)]
+    if sentence_ends and sentence_ends[-1] > len(head) * 0.8:
+        head = head[: sentence_ends[-1]]
+
+    # Start the tail at its first full sentence under the same rule
+    first_end = SENTENCE_END_PATTERN.search(tail)
+    if first_end and first_end.end() < len(tail) * 0.2:
+        tail = tail[first_end.end() :]
+
+    return head.strip() + TRIM_MARKER + tail.strip()
+
+
+def estimate_chat_tokens(messages, max_output_tokens=None):
+    """Estimate the total tokens a chat completion call will consume."""
+    # Each message carries a few tokens of role and formatting overhead
+    prompt_tokens = sum(
+        count_tokens(message.get("content") or "") + 4 for message in messages
+    )
+    return prompt_tokens + (max_output_tokens or DEFAULT_OUTPUT_TOKEN_ESTIMATE)
+
+
+def build_rag_context(results, token_budget=RAG_INPUT_TOKEN_BUDGET):
+    """Serialize search results compactly within the RAG token budget.
+
+    The budget is split evenly between results and each summary is trimmed to
+    its share, so one verbose page cannot crowd out the others.
+    """
+    if not results:
+        return "[]"
+
+    per_result_budget = max(token_budget // len(results), 1)
+    context = []
+    for item in results:
+        entry = {"title": item["title"], "link": item["link"]}
+        overhead = count_tokens(json.dumps(entry, ensure_ascii=False))
+        entry["summary"] = trim_to_token_budget(
+            item.get("summary") or "", max(per_result_budget - overhead, 1)
+        )
+        context.append(entry)
+
+    return json.dumps(context, separators=(",", ":"), ensure_ascii=False)
+
+
+class LLMUsage:
+    """Thread-safe record of the token usage of every LLM call of a task."""
+
+    def __init__(self, calls=None):
+        self._lock = threading.Lock()
+        self.calls = list(calls or [])
+
+    def record(self, stage, response):
+        """Record the usage reported by a chat completions response."""
+        usage = getattr(response, "usage", None)
+        call = {
+            "stage": stage,
+            "model": getattr(response, "model", None),
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+        }
+        with self._lock:
+            self.calls.append(call)
+
+    @property
+    def prompt_tokens(self):
+        with self._lock:
+            return sum(call["prompt_tokens"] for call in self.calls)
+
+    @property
+    def completion_tokens(self):
+        with self._lock:
+            return sum(call["completion_tokens"] for call in self.calls)
+
+    def as_dict(self):
+        with self._lock:
+            calls = list(self.calls)
+        return {
+            "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in calls),
+            "calls": calls,
+        }
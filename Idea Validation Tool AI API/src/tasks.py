@@ -1,9 +1,71 @@
-import os
+import json
+import time
 import logging
+from celery import chain, chord, signature
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_init, before_task_publish, task_prerun, task_postrun
 from src.celery_config import celery_app
-from src.services.ai_web_search_service import perform_search_and_summarize
-from src.services.email_service import send_email
+from src.services.ai_web_search_service import (
+    find_search_items,
+    fetch_page_within_budget,
+    parse_page_content,
+    summarize_content,
+    summarize_contents_batch,
+    build_search_result,
+    generate_rag_response,
+    prepare_page_content,
+    SUMMARY_BATCH_SIZE,
+    FETCH_TASK_BUDGET_SECONDS,
+)
+from src.services.token_budget_service import LLMUsage
+from src.services.ranking_service import select_search_items, MIN_FETCHED_PAGES
+from src.services.dedup_service import (
+    register_task_page,
+    clear_task_pages,
+    merge_duplicates,
+    expand_relevant_posts,
+)
+from src.services.coalescing_service import (
+    build_request_fingerprint,
+    refresh_in_flight_request,
+    release_in_flight_request,
+    build_recipients,
+)
+from src.services.semantic_cache_service import (
+    embed_idea,
+    find_reusable_results,
+    add_to_index,
+    load_index,
+)
+from src.services.checkpoint_service import (
+    create_task_record,
+    load_task_checkpoints,
+    save_search_checkpoint,
+    save_page_summaries,
+    load_page_summaries,
+    load_stored_summary,
+    add_relevant_posts,
+)
+from src.services.email_outbox_service import (
+    add_to_outbox,
+    enqueue_emails,
+    requeue_task_emails,
+    claim_due_emails,
+    record_delivery_results,
+    render_results_email,
+    RESULTS_EMAIL_SUBJECT,
+    EMAIL_OUTBOX_BATCH_SIZE,
+)
+from src.services.email_service import send_email_batch
+from src.services.metrics_service import (
+    start_worker_exporter,
+    stamp_published_message,
+    record_task_started,
+    record_task_finished,
+    PUBLISHED_AT_HEADER,
+)
 from datetime import datetime
+from sqlalchemy import update
 from src.models import get_db_session, SearchTask, RelevantPost
 from dotenv import load_dotenv
 
@@ -11,159 +73,756 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-CLIENT_APP_HOMEPAGE_URL = os.getenv("CLIENT_APP_HOMEPAGE_URL")
-
 # endregion
 
+# Per-stage retry policies. Completed stages are checkpointed on the task, so
+# a retry only repeats the work of the stage that failed. Page fetches are
+# not retried, a failed page is skipped, and the email stage retries only the
+# recipients whose email failed.
+SEARCH_STAGE_RETRY = {
+    "autoretry_for": (Exception,),
+    "max_retries": 3,
+    "retry_backoff": 10,
+    "retry_backoff_max": 120,
+}
+SUMMARY_STAGE_RETRY = {
+    "autoretry_for": (Exception,),
+    "max_retries": 2,
+    "retry_backoff": 5,
+    "retry_backoff_max": 60,
+}
+SYNTHESIS_STAGE_RETRY = {
+    "autoretry_for": (Exception,),
+    "max_retries": 3,
+    "retry_backoff": 30,
+    "retry_backoff_max": 300,
+}
+
+# Backstop for pools that enforce time limits. The thread pool of the fetch
+# worker does not, there the deadline passed to every fetch bounds it.
+FETCH_STAGE_TIME_LIMITS = {
+    "soft_time_limit": FETCH_TASK_BUDGET_SECONDS + 5,
+    "time_limit": FETCH_TASK_BUDGET_SECONDS + 15,
+}
+
+# Pathological HTML must not hold a process of the parse worker for long
+PARSE_STAGE_TIME_LIMITS = {
+    "soft_time_limit": 30,
+    "time_limit": 60,
+}
+
+
+@worker_init.connect
+def _load_semantic_index(**kwargs):
+    """Memory-map the semantic index once, prefork children inherit it."""
+    load_index()
+
+
+@worker_init.connect
+def _start_metrics_exporter(**kwargs):
+    """Export the metrics of this worker, prefork children included."""
+    start_worker_exporter()
+
+
+@before_task_publish.connect
+def _stamp_published_at(headers=None, **kwargs):
+    """Stamp every task message with its enqueue time."""
+    if headers is not None:
+        stamp_published_message(headers)
+
+
+@task_prerun.connect
+def _record_task_started(task_id=None, task=None, **kwargs):
+    """Measure how long the task waited in its queue."""
+    delivery_info = task.request.delivery_info or {}
+    record_task_started(
+        task_id,
+        task.name,
+        delivery_info.get("routing_key"),
+        getattr(task.request, PUBLISHED_AT_HEADER, None),
+    )
+
+
+@task_postrun.connect
+def _record_task_finished(task_id=None, task=None, state=None, **kwargs):
+    """Measure how long the task ran on the worker."""
+    record_task_finished(task_id, task.name, state)
+
+
+def _update_task(task_id, *conditions, **fields):
+    """Write stage status and results to the search_tasks row in one UPDATE.
+
+    Returns whether the row matched the extra conditions and was updated.
+    """
+    session = get_db_session()
+    try:
+        updated = (
+            session.query(SearchTask)
+            .filter(SearchTask.task_id == task_id, *conditions)
+            .update(fields, synchronize_session=False)
+        )
+        session.commit()
+        return updated > 0
+    finally:
+        session.close()
+
 
 @celery_app.task(bind=True, max_retries=3, name="tasks.process_search_and_email")
 def process_search_and_email(
-    self, user_email, user_query, problem_statement, target_audience
+    self, user_email, user_query, problem_statement, target_audience, fingerprint=None
 ):
     """
     Background task to perform search and send email with results.
-    This task is executed asynchronously by Celery workers.
+    Records the task and replaces itself with the staged pipeline:
+    similar idea lookup -> search -> chord(per-URL or per-batch fetch ->
+    summarize) -> RAG synthesis. The synthesis queues the results email in
+    the outbox, which is drained by its own sender.
+    The fingerprint identifies the in-flight window that identical requests
+    were coalesced into, their subscribers are emailed with the results.
+    Paraphrases of a recently analyzed idea reuse its search results and
+    only rerun the synthesis. A retried or resumed task continues from the
+    first stage without a checkpoint.
     """
     task_id = self.request.id
-    session = get_db_session()
 
     try:
-        # Create a new task record
-        task_record = SearchTask(
-            task_id=task_id,
-            email=user_email,
-            query=user_query,
-            problem_statement=problem_statement,
-            target_audience=target_audience,
-        )
-        session.add(task_record)
-        session.commit()
+        # Create the task record unless a previous attempt already did
+        checkpoints = create_task_record(
+            task_id,
+            user_email,
+            user_query,
+            problem_statement,
+            target_audience,
+            fingerprint
+            or build_request_fingerprint(
+                user_query, problem_statement, target_audience
+            ),
+        )
+    except Exception as e:
+        logging.error(f"Error creating task record {task_id}: {e}")
+        if self.request.retries >= self.max_retries:
+            # No pipeline will run, identical requests must not wait for it
+            mark_pipeline_failed(self.request, e, None, task_id, fingerprint)
+            raise
+        self.retry(exc=e, countdown=60)  # Retry after 1 minute
+
+    if checkpoints["email_sent_at"]:
+        logging.info(f"Task {task_id} has already been completed")
+        return True
+
+    refresh_in_flight_request(fingerprint, task_id)
+
+    if checkpoints["synthesized_at"]:
+        logging.info(f"Resuming task {task_id} at the email stage")
+        if not requeue_task_emails(task_id):
+            stored_summary = load_stored_summary(task_id)
+            enqueue_emails(
+                task_id,
+                [user_email],
+                RESULTS_EMAIL_SUBJECT,
+                render_results_email(
+                    user_query,
+                    stored_summary["analysis"],
+                    stored_summary["relevant_posts"],
+                ),
+            )
+        drain_email_outbox.delay()
+        return True
+
+    # Results of a similar idea are only worth looking up before the search
+    if checkpoints["search_items"] is not None:
+        logging.info(f"Resuming task {task_id} after the search stage")
+        pipeline = _search_pipeline(
+            task_id,
+            user_email,
+            user_query,
+            problem_statement,
+            target_audience,
+            fingerprint,
+        )
+    else:
+        pipeline = similar_idea_stage.s(
+            task_id,
+            user_email,
+            user_query,
+            problem_statement,
+            target_audience,
+            fingerprint=fingerprint,
+        )
 
+    return self.replace(pipeline.on_error(mark_pipeline_failed.s(task_id, fingerprint)))
+
+
+def _search_pipeline(
+    task_id, user_email, user_query, problem_statement, target_audience, fingerprint
+):
+    """Chain the search with the page fan-out that ends in the synthesis."""
+    return chain(
+        search_stage.s(task_id, user_query),
+        page_stage.s(
+            task_id,
+            user_email,
+            user_query,
+            problem_statement,
+            target_audience,
+            fingerprint=fingerprint,
+        ),
+    )
+
+
+@celery_app.task(bind=True, name="tasks.similar_idea_stage", acks_late=True)
+def similar_idea_stage(
+    self,
+    task_id,
+    user_email,
+    user_query,
+    problem_statement,
+    target_audience,
+    fingerprint=None,
+):
+    """Embed the idea and reuse the search results of a similar one if found.
+
+    Otherwise continues with the search, the embedding is stored to index the
+    idea once the task has completed, see synthesize_stage.
+    """
+    refresh_in_flight_request(fingerprint, task_id)
+
+    embedding = embed_idea(user_query, problem_statement, target_audience)
+    reusable = find_reusable_results(embedding)
+    if reusable:
+        source_task_id, similarity, search_results = reusable
         logging.info(
-            f"Starting background search for query: {user_query} (Task ID: {task_id})"
+            f"Reusing search results of task {source_task_id} "
+            f"(similarity {similarity:.3f}) for task {task_id}"
         )
+        _update_task(task_id, reused_results_from=source_task_id)
 
-        # Perform search and get results
-        search_results = perform_search_and_summarize(
-            user_query, problem_statement, target_audience
+        return self.replace(
+            synthesize_stage.s(
+                search_results,
+                task_id,
+                user_query,
+                problem_statement,
+                target_audience,
+                [],
+                fingerprint=fingerprint,
+            )
         )
 
-        if not search_results:
-            logging.warning(f"No search results found for query: {user_query}")
-            # Update task status
-            task_record.status = "FAILURE"
-            task_record.completed_at = datetime.utcnow()
-            session.commit()
-            return False
+    if embedding is not None:
+        _update_task(task_id, idea_embedding=embedding.tobytes())
 
-        # Extract key fields
-        final_summary = search_results.get("final_summary", {})
-        analysis = final_summary.get("analysis", "No analysis available.")
-        relevant_posts = final_summary.get("relevant_posts", [])
+    logging.info(
+        f"Starting background search for query: {user_query} (Task ID: {task_id})"
+    )
+    return self.replace(
+        _search_pipeline(
+            task_id,
+            user_email,
+            user_query,
+            problem_statement,
+            target_audience,
+            fingerprint,
+        )
+    )
 
-        # Store analysis and relevant posts
-        task_record.analysis = analysis
-        task_record.status = "SUCCESS"
-        task_record.completed_at = datetime.utcnow()
-        session.commit()
 
-        # Store relevant posts
-        for post in relevant_posts:
-            post_record = RelevantPost(
-                task_id=task_id,
-                title=post.get("title", "Untitled"),
-                link=post.get("link", ""),
+@celery_app.task(name="tasks.search_stage", acks_late=True, **SEARCH_STAGE_RETRY)
+def search_stage(task_id, user_query):
+    """Generate the refined search term and run the Google search.
+
+    Non-empty results are checkpointed and returned again on a resume.
+    """
+    checkpoints = load_task_checkpoints(task_id)
+    if checkpoints and checkpoints["search_items"] is not None:
+        return {
+            "refined_query": checkpoints["refined_query"],
+            "items": checkpoints["search_items"],
+            "usage_calls": checkpoints["search_usage_calls"],
+        }
+
+    _update_task(task_id, status="SEARCHING")
+
+    usage = LLMUsage()
+    refined_query, search_items = find_search_items(user_query, usage)
+
+    search_output = {
+        "refined_query": refined_query,
+        "items": [
+            {field: item.get(field, "") for field in ("link", "title", "snippet")}
+            for item in search_items
+        ],
+        "usage_calls": usage.as_dict()["calls"],
+    }
+    if search_output["items"]:
+        save_search_checkpoint(
+            task_id, refined_query, search_output["items"], search_output["usage_calls"]
+        )
+    return search_output
+
+
+@celery_app.task(bind=True, name="tasks.page_stage")
+def page_stage(
+    self,
+    search_output,
+    task_id,
+    user_email,
+    user_query,
+    problem_statement,
+    target_audience,
+    fingerprint=None,
+):
+    """Fan out the pages of the search, then synthesize.
+
+    Only the best ranked hits are fetched. With batching disabled every URL
+    gets its own fetch -> summarize chain. Otherwise the hits are grouped in
+    batches of SUMMARY_BATCH_SIZE, and each batch is summarized with one LLM
+    call as soon as its own fetches are done, while later batches are still
+    fetching. Either way a second round from the ranked reserve runs if too
+    few pages survive. Pages summarized by an earlier attempt are not fetched
+    again.
+    """
+    search_items = search_output["items"]
+
+    if not search_items:
+        logging.warning(f"No search results found for query: {user_query}")
+        release_in_flight_request(fingerprint, task_id)
+        _update_task(task_id, status="FAILURE", completed_at=datetime.utcnow())
+        return False
+
+    refresh_in_flight_request(fingerprint, task_id)
+    _update_task(task_id, status="PROCESSING_PAGES")
+
+    selected_items, reserve_items = select_search_items(
+        search_items, user_query, problem_statement
+    )
+
+    summarized_orders = [page["order"] for page in load_page_summaries(task_id)]
+    if summarized_orders:
+        logging.info(
+            f"Resuming task {task_id} with {len(summarized_orders)} page(s) already summarized"
+        )
+    pending_items = [
+        (idx, item)
+        for idx, item in enumerate(selected_items, start=1)
+        if idx not in summarized_orders
+    ]
+
+    synthesis = synthesize_stage.s(
+        task_id,
+        user_query,
+        problem_statement,
+        target_audience,
+        search_output["usage_calls"],
+        fingerprint=fingerprint,
+    )
+
+    # All pages of a round share one wall-clock budget, stragglers are dropped
+    deadline = time.time() + FETCH_TASK_BUDGET_SECONDS
+
+    page_tasks = _page_fan_out(task_id, pending_items, user_query, deadline)
+    top_up = reserve_pages_stage.s(
+        user_query,
+        synthesis,
+        task_id=task_id,
+        reserve_items=reserve_items,
+        next_order=len(selected_items) + 1,
+        summarized_orders=summarized_orders,
+    )
+    if not page_tasks:
+        return self.replace(top_up.clone(args=([],)))
+    return self.replace(chord(page_tasks, top_up))
+
+
+def _page_fan_out(task_id, page_items, user_query, deadline):
+    """Build the fetch -> parse -> summarize tasks of one round of pages.
+
+    Every page gets its own chain, or with batching enabled every
+    SUMMARY_BATCH_SIZE pages share one chord of fetches -> summarize_batch_stage.
+    """
+    if SUMMARY_BATCH_SIZE <= 1:
+        return [
+            chain(
+                _fetch_and_parse(task_id, idx, item, user_query, deadline),
+                summarize_page_stage.s(user_query, task_id=task_id),
             )
-            session.add(post_record)
-        session.commit()
+            for idx, item in page_items
+        ]
 
-        # Format and send email
-        send_results_email(user_email, user_query, analysis, relevant_posts)
+    return [
+        chord(
+            [
+                _fetch_and_parse(task_id, idx, item, user_query, deadline)
+                for idx, item in page_items[start : start + SUMMARY_BATCH_SIZE]
+            ],
+            summarize_batch_stage.s(user_query, task_id=task_id),
+        )
+        for start in range(0, len(page_items), SUMMARY_BATCH_SIZE)
+    ]
+
+
+def _fetch_and_parse(task_id, order, item, user_query, deadline):
+    """Download a page on the fetch worker, then extract it on the parse worker."""
+    return chain(
+        fetch_page_stage.s(task_id, order, item, deadline=deadline),
+        parse_page_stage.s(user_query, task_id=task_id),
+    )
 
-        logging.info(f"Search and email completed for {user_email}")
-        return True
 
+@celery_app.task(
+    name="tasks.fetch_page_stage",
+    acks_late=True,
+    reject_on_worker_lost=True,
+    **FETCH_STAGE_TIME_LIMITS,
+)
+def fetch_page_stage(task_id, order, item, deadline=None):
+    """Download one search result page. Failures yield None.
+
+    Pages are fetched under the per-host limit and skipped once the deadline
+    (epoch seconds) of their round has passed, also while still queued. The
+    page is only downloaded here, parse_page_stage turns it into text.
+    """
+    url = item.get("link")
+    if deadline is not None and time.time() >= deadline:
+        logging.warning(f"Skipping {url}: fetch budget exceeded while queued")
+        return None
+
+    try:
+        page = fetch_page_within_budget(url, deadline)
+    except SoftTimeLimitExceeded:
+        logging.warning(f"Skipping {url}: fetch task time limit exceeded")
+        return None
     except Exception as e:
-        logging.error(f"Error in background task: {e}")
-        # Update task status in database
-        if task_record:
-            task_record.status = "FAILURE"
-            task_record.completed_at = datetime.utcnow()
-            session.commit()
-        # Retry the task up to max_retries times
-        self.retry(exc=e, countdown=60)  # Retry after 1 minute
-        return False
+        logging.error(f"Unexpected error fetching {url}: {e}")
+        return None
+
+    if not page:
+        logging.info(f"Skipping {url}")
+        return None
+
+    return {"order": order, "item": item, "page": page}
+
+
+@celery_app.task(
+    name="tasks.parse_page_stage",
+    acks_late=True,
+    reject_on_worker_lost=True,
+    **PARSE_STAGE_TIME_LIMITS,
+)
+def parse_page_stage(fetched, user_query, task_id=None):
+    """Turn one downloaded page into the content to summarize. Failures yield None.
+
+    Extraction and compression are CPU bound and run on the prefork parse
+    worker, not on the fetch threads. Near-duplicates of a page already
+    fetched for the same task are marked with duplicate_of and are not
+    summarized.
+    """
+    if not fetched:
+        return None
+
+    order, item = fetched["order"], fetched["item"]
+    url = item.get("link")
+    try:
+        web_content = parse_page_content(url, fetched["page"])
+        if not web_content:
+            logging.info(f"Skipping {url}: no text extracted")
+            return None
+
+        # Only the relevant, budgeted part is ever sent to the LLM, keep messages small
+        content = prepare_page_content(web_content, user_query)
+    except SoftTimeLimitExceeded:
+        logging.warning(f"Skipping {url}: parse task time limit exceeded")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error parsing {url}: {e}")
+        return None
+
+    duplicate_of = register_task_page(task_id, order, content)
+    if duplicate_of is not None:
+        logging.info(f"Skipping {url}: near-duplicate of result {duplicate_of}")
+        return {"order": order, "item": item, "duplicate_of": duplicate_of}
+
+    return {"order": order, "item": item, "content": content}
+
+
+@celery_app.task(
+    name="tasks.summarize_page_stage", acks_late=True, **SUMMARY_STAGE_RETRY
+)
+def summarize_page_stage(page, user_query, character_limit=700, task_id=None):
+    """Summarize and checkpoint one fetched page. Skipped pages and duplicates pass through."""
+    if not page or "duplicate_of" in page:
+        return page
+
+    usage = LLMUsage()
+    summary = summarize_content(page["content"], user_query, character_limit, usage)
+    result = build_search_result(page["order"], page["item"], summary)
+    result["usage_calls"] = usage.as_dict()["calls"]
+    if task_id:
+        save_page_summaries(task_id, [result])
+    return result
+
+
+@celery_app.task(bind=True, name="tasks.reserve_pages_stage")
+def reserve_pages_stage(
+    self,
+    batch_results,
+    user_query,
+    synthesis,
+    task_id=None,
+    reserve_items=None,
+    next_order=None,
+    earlier_results=None,
+    summarized_orders=None,
+):
+    """Collect the summarized pages or batches and hand them to the synthesis.
+
+    If fewer than MIN_FETCHED_PAGES pages survived, counting those summarized
+    by an earlier attempt, the missing number is first fetched and
+    summarized from the reserve and this stage runs once more.
+    """
+    refresh_in_flight_request(signature(synthesis).kwargs.get("fingerprint"), task_id)
+
+    # Batched summaries arrive as one list per batch
+    results = (earlier_results or []) + [
+        result
+        for group in batch_results
+        for result in (group if isinstance(group, list) else [group])
+        if result
+    ]
+    summarized = [result for result in results if "duplicate_of" not in result]
+    summarized_orders = summarized_orders or []
+
+    missing_pages = MIN_FETCHED_PAGES - len(summarized) - len(summarized_orders)
+    reserve_pages = [
+        (idx, item)
+        for idx, item in enumerate(reserve_items or [], start=next_order or 1)
+        if idx not in summarized_orders
+    ][: max(missing_pages, 0)]
+    if reserve_pages:
+        logging.info(
+            f"Only {len(summarized) + len(summarized_orders)} page(s) survived, "
+            f"fetching up to {missing_pages} more"
+        )
+        deadline = time.time() + FETCH_TASK_BUDGET_SECONDS
+        return self.replace(
+            chord(
+                _page_fan_out(task_id, reserve_pages, user_query, deadline),
+                reserve_pages_stage.s(
+                    user_query, synthesis, task_id=task_id, earlier_results=results
+                ),
+            )
+        )
+
+    return self.replace(signature(synthesis).clone(args=(results,)))
+
+
+@celery_app.task(
+    name="tasks.summarize_batch_stage", acks_late=True, **SUMMARY_STAGE_RETRY
+)
+def summarize_batch_stage(pages, user_query, character_limit=700, task_id=None):
+    """Summarize and checkpoint a batch of fetched pages with one LLM call.
+
+    Skipped pages are dropped, duplicates pass through.
+    """
+    pages = [page for page in pages if page]
+    fetched = [page for page in pages if "duplicate_of" not in page]
+
+    if not fetched:
+        return pages
+
+    usage = LLMUsage()
+    summaries = summarize_contents_batch(
+        [page["content"] for page in fetched], user_query, character_limit, usage
+    )
+    results = [
+        build_search_result(page["order"], page["item"], summary)
+        for page, summary in zip(fetched, summaries)
+    ]
+    if results:
+        results[0]["usage_calls"] = usage.as_dict()["calls"]
+    if task_id:
+        save_page_summaries(task_id, results)
+
+    return results + [page for page in pages if "duplicate_of" in page]
+
+
+@celery_app.task(bind=True, name="tasks.synthesize_stage", **SYNTHESIS_STAGE_RETRY)
+def synthesize_stage(
+    self,
+    page_results,
+    task_id,
+    user_query,
+    problem_statement,
+    target_audience,
+    search_usage_calls,
+    fingerprint=None,
+):
+    """Run the RAG synthesis over all page summaries and store the results.
+
+    The results email is queued in the outbox in the same transaction as the
+    results. Closes the in-flight window once the results are stored and
+    queues the email for the coalesced subscribers too. A stored synthesis is never
+    run twice, a redelivery only queues the email for subscribers still in the
+    window. A failed RAG call is retried before falling back to an email
+    without analysis.
+    """
+    # Single conditional UPDATE, it misses a task whose synthesis is stored
+    if not _update_task(
+        task_id, SearchTask.synthesized_at.is_(None), status="SYNTHESIZING"
+    ):
+        # A redelivery after the commit, the window may still hold subscribers
+        subscribers = release_in_flight_request(fingerprint, task_id)
+        stored_summary = load_stored_summary(task_id)
+        enqueue_emails(
+            task_id,
+            build_recipients(stored_summary["email"], subscribers)[1:],
+            RESULTS_EMAIL_SUBJECT,
+            render_results_email(
+                user_query,
+                stored_summary["analysis"],
+                stored_summary["relevant_posts"],
+            ),
+        )
+        drain_email_outbox.delay()
+        return {
+            "analysis": stored_summary["analysis"],
+            "relevant_posts": stored_summary["relevant_posts"],
+            "subscribers": subscribers,
+        }
+
+    refresh_in_flight_request(fingerprint, task_id)
+
+    # Batched summaries arrive as one list per batch
+    page_results = [
+        result
+        for group in page_results
+        for result in (group if isinstance(group, list) else [group])
+        if result
+    ]
+
+    # Pages summarized by an earlier attempt of this task were not fetched again
+    received_orders = {result["order"] for result in page_results}
+    page_results += [
+        page
+        for page in load_page_summaries(task_id)
+        if page["order"] not in received_orders
+    ]
+
+    usage = LLMUsage(calls=search_usage_calls)
+    structured_results = []
+    duplicates = []
+    for result in sorted(filter(None, page_results), key=lambda r: r["order"]):
+        if "duplicate_of" in result:
+            duplicates.append((result["duplicate_of"], result["item"]))
+            continue
+        usage.calls.extend(result.pop("usage_calls", []))
+        structured_results.append(result)
+
+    merge_duplicates(structured_results, duplicates)
+    clear_task_pages(task_id)
+
+    final_summary = generate_rag_response(
+        user_query, structured_results, problem_statement, target_audience, usage
+    )
+    if final_summary is None and self.request.retries < self.max_retries:
+        # Retried with the backoff of the stage, the summaries are kept
+        raise RuntimeError(f"RAG synthesis failed for task {task_id}")
+    final_summary = final_summary or {}
+    analysis = final_summary.get("analysis", "No analysis available.")
+    relevant_posts = expand_relevant_posts(
+        final_summary.get("relevant_posts", []), structured_results
+    )
+
+    # Store analysis, token usage, relevant posts and the email in one transaction
+    usage_totals = usage.as_dict()
+    session = get_db_session()
+    try:
+        user_email, idea_embedding = session.execute(
+            update(SearchTask)
+            .where(SearchTask.task_id == task_id)
+            .values(
+                analysis=analysis,
+                prompt_tokens=usage_totals["prompt_tokens"],
+                completion_tokens=usage_totals["completion_tokens"],
+                llm_usage=json.dumps(usage_totals["calls"]),
+                search_results=json.dumps(structured_results),
+                status="SENDING_EMAIL",
+                synthesized_at=datetime.utcnow(),
+            )
+            .returning(SearchTask.email, SearchTask.idea_embedding)
+            .execution_options(synchronize_session=False)
+        ).one()
+
+        # Posts of an attempt that failed before committing are replaced
+        session.query(RelevantPost).filter(RelevantPost.task_id == task_id).delete(
+            synchronize_session=False
+        )
+        add_relevant_posts(session, task_id, relevant_posts)
+
+        email_body = render_results_email(user_query, analysis, relevant_posts)
+        add_to_outbox(session, task_id, [user_email], RESULTS_EMAIL_SUBJECT, email_body)
+        session.commit()
     finally:
         session.close()
 
+    # Make the results reusable for paraphrases of this idea
+    add_to_index(task_id, idea_embedding)
 
-def format_relevant_posts(posts):
-    """Formats links as clickable text with titles instead of displaying raw URLs."""
-    if not posts:
-        return "<p>No relevant posts found.</p>"
-
-    formatted_links = ""
-    for post in posts:
-        title = post.get("title", "Untitled Article")
-        url = post.get("link")
-        formatted_links += f'<li><a href="{url}" target="_blank">{title}</a></li>'
-    return formatted_links
-
-
-def send_results_email(user_email, user_query, analysis, relevant_posts):
-    """Format and send email with search results."""
-    # Get current year
-    current_year = datetime.now().year
-
-    # Format email content with HTML
-    email_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <body style="font-family: 'Google Sans', Verdana, sans-serif; color: #333; line-height: 1.6; background-color: #f4f4f4; margin: 0; padding: 20px;">
-        <div style="max-width: 600px; margin: 20px auto; padding: 20px; border: 1px solid #ddd; border-radius: 8px; background: #ffffff; box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);">
-            <div style="color: #4084f4; border-bottom: 2px solid #ddd; padding-bottom: 5px; margin-bottom: 20px;">
-                <h2 style="font-size: 22px;margin-top: 0;">Dassyor AI Search Analysis</h2>
-            </div>
-
-            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
-                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Analysis</h3>
-                <p style="font-size: 16px;margin-bottom: 0;white-space: pre-wrap;">{analysis}</p>
-            </div>
-
-            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
-                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Relevant Resources</h3>
-                <ul style="padding-left: 20px;font-size: 16px;">
-                    {format_relevant_posts(relevant_posts)}
-                </ul>
-            </div>
-
-            <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);">
-                <h3 style="color: #4084f4;margin-top: 0;font-size: 20px;">Next Step</h3>
-                <p style="font-size: 16px;margin-top: 0;margin-bottom: 0;">
-                    Startups face numerous challenges, and your tool has the potential to
-                    make a real impact in solving them. To refine and validate your idea
-                    further, explore the idea validation phase on Dassyor. Our advanced AI
-                    will provide insights and guidance to help you shape your concept
-                    effectively. This phase is completely free, and you can get started by
-                    signing up <a href="{CLIENT_APP_HOMEPAGE_URL}" target="_blank" style="color: #4084f4; text-decoration: none; font-weight: bold;">here</a>.
-                </p>
-            </div>
-
-            <div style="margin-top: 20px; font-size: 12px; color: #666; text-align: center;">
-                <p>This email was generated automatically by Dassyor AI.</p>
-                <p>&copy; {current_year} Dassyor. All rights reserved.</p>
-                <p>Tashkent, Uzbekistan</p>
-            </div>
-        </div>
-    </body>
-    </html>
+    subscribers = release_in_flight_request(fingerprint, task_id)
+    enqueue_emails(
+        task_id,
+        build_recipients(user_email, subscribers)[1:],
+        RESULTS_EMAIL_SUBJECT,
+        email_body,
+    )
+    drain_email_outbox.delay()
+
+    return {
+        "analysis": analysis,
+        "relevant_posts": relevant_posts,
+        "subscribers": subscribers,
+    }
+
+
+# Acknowledged early on purpose: leased emails are retried by a later drain
+@celery_app.task(name="tasks.drain_email_outbox", acks_late=False)
+def drain_email_outbox():
+    """Send the due emails of the outbox in batches, one SMTP session each.
+
+    Failed emails are retried by later drains with exponential backoff, and
+    tasks are completed once all of their emails are sent.
     """
+    sent = failed = 0
+    while True:
+        emails = claim_due_emails(EMAIL_OUTBOX_BATCH_SIZE)
+        if not emails:
+            break
 
-    return send_email(user_email, "Your Idea Validation Results", email_body)
+        errors = send_email_batch(
+            [(email["recipient"], email["subject"], email["body"]) for email in emails]
+        )
+        record_delivery_results(emails, errors)
 
+        batch_failed = sum(error is not None for error in errors)
+        failed += batch_failed
+        sent += len(emails) - batch_failed
+        if len(emails) < EMAIL_OUTBOX_BATCH_SIZE:
+            break
 
-# Optional (removed from the final code)
-# <div style="margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-radius: 5px; box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.1);font-size: 16px;">
-#     <strong style="color: #4084f4;">Your search query:</strong>
-#     <em>{user_query}</em>
-# </div>
+    if sent or failed:
+        logging.info(f"Email outbox drained: {sent} sent, {failed} failed")
+    return {"sent": sent, "failed": failed}
+
+
+@celery_app.task(name="tasks.mark_pipeline_failed")
+def mark_pipeline_failed(request, exc, traceback, task_id, fingerprint=None):
+    """Error callback of the pipeline, records the failure on the task row."""
+    logging.error(f"Error in background task {task_id}: {exc}")
+
+    # Let identical requests start a fresh pipeline instead of joining this one
+    subscribers = release_in_flight_request(fingerprint, task_id)
+    if len(subscribers) > 1:
+        logging.warning(
+            f"{len(subscribers)} coalesced subscribers of task {task_id} will not receive results"
+        )
+    _update_task(task_id, status="FAILURE", completed_at=datetime.utcnow())